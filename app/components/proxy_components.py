@@ -1,21 +1,202 @@
 """
 Components specific to reverse proxy management
 """
+import json
 import streamlit as st
-import pandas as pd
 from .ui_components import (
     section_header,
     confirmation_dialog,
     data_table,
     action_button,
-    empty_state
+    empty_state,
+    paginate
 )
 
+# Rules shown per page of the table
+RULES_PAGE_SIZE = 50
 
+# Static table configuration, built once at import instead of every rerun
+_COLUMN_CONFIG = {
+    "Select": st.column_config.CheckboxColumn(
+        "Select",
+        help="Select rules to delete",
+        default=False,
+    ),
+    "Frontend Port": st.column_config.NumberColumn(format="%d"),
+    "Backend Port": st.column_config.NumberColumn(format="%d"),
+    "_uuid": None,
+}
+
+_DISABLED_COLUMNS = ["Description", "Domain", "Frontend Port", "Backend Host", "Backend Port", "HSTS", "WebSocket"]
+
+
+def _column(flat, name, default=None):
+    """Return a column from a normalized frame, or a default-filled Series if absent"""
+    import pandas as pd
+
+    if name in flat:
+        return flat[name]
+    return pd.Series([default] * len(flat), index=flat.index, dtype=object)
+
+
+@st.cache_data(show_spinner=False)
+def _build_rules_df(rules):
+    """
+    Convert raw reverse proxy rules into the table DataFrame
+
+    Streamlit hashes ``rules`` by content, so reruns with an unchanged
+    rule list return the cached frame instead of rebuilding it. Nested
+    fields are flattened with ``pd.json_normalize`` so the per-rule work
+    runs in pandas rather than a Python loop.
+
+    Args:
+        rules: List of rule dicts from the Synology API
+
+    Returns:
+        DataFrame with one row per rule
+    """
+    import numpy as np
+    import pandas as pd
+
+    flat = pd.json_normalize(rules, sep='.')
+
+    fallback_ids = pd.Series([f'rule_{idx}' for idx in range(len(flat))], index=flat.index)
+    rule_uuids = _column(flat, 'UUID').fillna(_column(flat, 'uuid')).fillna(fallback_ids)
+
+    # Nullable boolean first: fillna on the object column would downcast (deprecated in pandas)
+    hsts = _column(flat, 'frontend.https.hsts', False).astype('boolean').fillna(False).astype(bool)
+    # WebSocket rules carry custom Upgrade/Connection headers
+    headers = _column(flat, 'customize_headers')
+    ws_mask = (headers.notna() & headers.str.len().gt(0)).to_numpy()
+
+    df = pd.DataFrame({
+        'Select': False,
+        'Description': _column(flat, 'description'),
+        'Domain': _column(flat, 'frontend.fqdn'),
+        'Frontend Port': _column(flat, 'frontend.port'),
+        'Backend Host': _column(flat, 'backend.fqdn'),
+        'Backend Port': _column(flat, 'backend.port'),
+        'HSTS': np.where(hsts, '✅', '❌'),
+        'WebSocket': np.where(ws_mask, '✅', '❌'),
+        '_uuid': rule_uuids
+    })
+
+    # Compact dtypes: Arrow-backed columns go to the browser without a
+    # Python object conversion, and the emoji flags collapse to categories
+    for col in ('HSTS', 'WebSocket'):
+        df[col] = df[col].astype('category')
+    for col in ('Frontend Port', 'Backend Port'):
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int32').astype('int32[pyarrow]')
+    df['_uuid'] = df['_uuid'].astype('string[pyarrow]')
+
+    # Lowercased search haystack, built once per snapshot so filtering is
+    # a single literal scan ('\x1f' keeps matches from spanning both fields)
+    df['_search'] = (
+        df['Description'].fillna('').astype(str).str.lower() + '\x1f' +
+        df['Domain'].fillna('').astype(str).str.lower()
+    ).astype('string[pyarrow]')
+
+    return df
+
+
+@st.cache_data(show_spinner=False)
+def _rule_json(rule):
+    """Pretty-printed JSON for a rule, cached so the debug view skips re-serializing"""
+    return json.dumps(rule, indent=2, default=str)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_rules(_manager, manager_id, rules_version):
+    """Rule list snapshot, keyed on the manager and its rules revision"""
+    return _manager.list_rules(refresh=False)
+
+
+def cached_rules(manager):
+    """
+    Get reverse proxy rules, reusing one snapshot across reruns
+
+    The snapshot is keyed on the manager's ``rules_version``, so any
+    refresh, add or delete on the manager invalidates it automatically.
+
+    Args:
+        manager: SynologyReverseProxyManager instance
+
+    Returns:
+        List of rule dicts
+    """
+    return _cached_rules(manager, id(manager), manager.rules_version)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_port_summary(_manager, manager_id, rules_version):
+    """Used ports and next free port, keyed on the rules version"""
+    return _manager.get_used_ports(), _manager.suggest_next_port()
+
+
+def port_summary(manager):
+    """
+    Get the ports in use and the next available port for the current rules
+
+    Args:
+        manager: SynologyReverseProxyManager instance
+
+    Returns:
+        Tuple of (sorted list of used backend ports, next free port or None)
+    """
+    return _cached_port_summary(manager, id(manager), manager.rules_version)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_port_caption(_manager, manager_id, rules_version):
+    """Rendered port usage caption, so reruns don't re-join the port list"""
+    used_ports, next_port = _cached_port_summary(_manager, manager_id, rules_version)
+    shown = ', '.join(map(str, used_ports[:15]))
+    more = f" ... ({len(used_ports)} total)" if len(used_ports) > 15 else ""
+    return f"**Ports in use:** {shown}{more}  \n**Next available port:** {next_port}"
+
+
+def _reset_rules_editor():
+    """Start a fresh data editor so stale row edits don't override the selection"""
+    st.session_state.rules_editor_version += 1
+
+
+def _sync_selection(editor_key, row_uuids):
+    """
+    Fold data editor checkbox edits into the session selection
+
+    Runs as the editor's on_change callback, so the selection (and the
+    delete button count) is already current when the script reruns.
+
+    Args:
+        editor_key: Session state key of the data editor
+        row_uuids: Rule UUIDs in the order the editor displays them
+    """
+    current = st.session_state.selected_rule_ids
+    new_selection = set(current)
+    edited_rows = st.session_state[editor_key].get('edited_rows', {})
+
+    for row, changes in edited_rows.items():
+        if 'Select' not in changes:
+            continue
+        rule_uuid = row_uuids[int(row)]
+        if changes['Select']:
+            new_selection.add(rule_uuid)
+        else:
+            new_selection.discard(rule_uuid)
+
+    # Length check first so most changes skip the element-wise comparison
+    if len(new_selection) != len(current) or new_selection != current:
+        st.session_state.selected_rule_ids = new_selection
+
+
+@st.fragment
 def proxy_rules_table(manager):
     """
     Display reverse proxy rules table with selection and delete functionality
 
+    Runs as a fragment so table interactions only rerun this block
+    instead of the whole page.
+
     Args:
         manager: SynologyReverseProxyManager instance
 
@@ -24,7 +205,9 @@ def proxy_rules_table(manager):
     """
     # Initialize session state
     if 'selected_rule_ids' not in st.session_state:
-        st.session_state.selected_rule_ids = []
+        st.session_state.selected_rule_ids = set()
+    if 'rules_editor_version' not in st.session_state:
+        st.session_state.rules_editor_version = 0
 
     # Header with refresh button
     col1, col2 = st.columns([4, 1])
@@ -33,11 +216,12 @@ def proxy_rules_table(manager):
     with col2:
         if action_button("Refresh", key="refresh_rules", icon="🔄", type="secondary"):
             manager.list_rules(refresh=True)
-            st.session_state.selected_rule_ids = []
-            st.rerun()
+            st.session_state.selected_rule_ids = set()
+            _reset_rules_editor()
+            st.rerun(scope="fragment")
 
     # Get rules
-    rules = manager.list_rules(refresh=False)
+    rules = cached_rules(manager)
 
     if not rules:
         empty_state(
@@ -50,57 +234,47 @@ def proxy_rules_table(manager):
 
     st.caption(f"Found {len(rules)} rules")
 
-    # Debug expander
-    with st.expander("🔍 Debug: API Response Structure", expanded=False):
-        st.json(rules[0])
-        st.caption("Available keys:")
-        st.code(str(list(rules[0].keys())))
-
-    # Convert to DataFrame
-    rules_data = []
-    for idx, rule in enumerate(rules):
-        frontend = rule.get('frontend', {})
-        backend = rule.get('backend', {})
-        has_ws = len(rule.get('customize_headers', [])) > 0
-        rule_uuid = rule.get('UUID', rule.get('uuid', f'rule_{idx}'))
-
-        rules_data.append({
-            'Select': False,
-            'Description': rule.get('description'),
-            'Domain': frontend.get('fqdn'),
-            'Frontend Port': frontend.get('port'),
-            'Backend Host': backend.get('fqdn'),
-            'Backend Port': backend.get('port'),
-            'HSTS': '✅' if frontend.get('https', {}).get('hsts') else '❌',
-            'WebSocket': '✅' if has_ws else '❌',
-            '_uuid': rule_uuid
-        })
-
-    df = pd.DataFrame(rules_data)
+    # Debug expander (only rendered when debug mode is enabled in the sidebar)
+    if st.session_state.get('debug_mode'):
+        with st.expander("🔍 Debug: API Response Structure", expanded=False):
+            st.code(_rule_json(rules[0]), language='json')
+            st.caption("Available keys:")
+            st.code(str(list(rules[0].keys())))
+
+    # Convert to DataFrame (cached on rule content)
+    df = _build_rules_df(rules)
 
     # Search filter
-    search = st.text_input("🔍 Search rules", placeholder="Search by description or domain...")
+    # Wrapped in a form so filtering only reruns on submit, not per keystroke
+    with st.form("search_form", clear_on_submit=False):
+        search_col, submit_col = st.columns([4, 1])
+        with search_col:
+            search_input = st.text_input(
+                "🔍 Search rules",
+                value=st.session_state.get('rules_search', ''),
+                placeholder="Search by description or domain..."
+            )
+        with submit_col:
+            if st.form_submit_button("Filter", use_container_width=True):
+                st.session_state.rules_search = search_input
+                st.session_state.rules_page = 0
+                _reset_rules_editor()
+
+    search = st.session_state.get('rules_search', '')
     if search:
-        df = df[
-            df['Description'].str.contains(search, case=False, na=False) |
-            df['Domain'].str.contains(search, case=False, na=False)
-        ]
+        df = df.loc[df['_search'].str.contains(search.lower(), regex=False, na=False)]
 
-    # Action buttons
+    # Action buttons - one horizontal flex container instead of three columns
     st.divider()
-    col1, col2, col3 = st.columns(3)
-
-    with col1:
+    with st.container(horizontal=True):
         if action_button("Select All", key="select_all", icon="✅", type="secondary"):
-            st.session_state.selected_rule_ids = df['_uuid'].tolist()
-            st.rerun()
+            st.session_state.selected_rule_ids = set(df['_uuid'])
+            _reset_rules_editor()
 
-    with col2:
         if action_button("Deselect All", key="deselect_all", icon="❌", type="secondary"):
-            st.session_state.selected_rule_ids = []
-            st.rerun()
+            st.session_state.selected_rule_ids = set()
+            _reset_rules_editor()
 
-    with col3:
         selected_count = len(st.session_state.selected_rule_ids)
         delete_disabled = selected_count == 0
 
@@ -124,11 +298,11 @@ def proxy_rules_table(manager):
 
         if confirm:
             with st.spinner(f"Deleting {selected_count} rule(s)..."):
-                success, message = manager.delete_rules_bulk(st.session_state.selected_rule_ids)
+                success, message = manager.delete_rules_bulk(sorted(st.session_state.selected_rule_ids))
 
                 if success:
                     st.success(f"✅ {message}")
-                    st.session_state.selected_rule_ids = []
+                    st.session_state.selected_rule_ids = set()
                     st.session_state.confirm_delete = False
                     st.rerun()
                 else:
@@ -137,38 +311,25 @@ def proxy_rules_table(manager):
 
         if cancel:
             st.session_state.confirm_delete = False
-            st.rerun()
+            st.rerun(scope="fragment")
 
     st.divider()
 
-    # Data table
-    edited_df = data_table(
-        df,
-        key="proxy_rules_table",
-        column_config={
-            "Select": st.column_config.CheckboxColumn(
-                "Select",
-                help="Select rules to delete",
-                default=False,
-            ),
-            "Frontend Port": st.column_config.NumberColumn(format="%d"),
-            "Backend Port": st.column_config.NumberColumn(format="%d"),
-            "_uuid": None,
-        },
-        disabled_columns=["Description", "Domain", "Frontend Port", "Backend Host", "Backend Port", "HSTS", "WebSocket"]
-    )
+    # Pagination - only the visible page is sent to the data editor
+    df_page = paginate(df, 'rules_page', RULES_PAGE_SIZE, on_page_change=_reset_rules_editor)
 
-    # Update selection
-    selected_rules = edited_df[edited_df['Select'] == True]['_uuid'].tolist()
-    if selected_rules != st.session_state.selected_rule_ids:
-        st.session_state.selected_rule_ids = selected_rules
-        st.rerun()
+    # Data table - the Select column mirrors the session selection, and edits
+    # are folded back in by the on_change callback before the next rerun
+    editor_key = f"proxy_rules_table_{st.session_state.rules_editor_version}"
+    data_table(
+        df_page.drop(columns='_search').assign(Select=df_page['_uuid'].isin(st.session_state.selected_rule_ids)),
+        key=editor_key,
+        column_config=_COLUMN_CONFIG,
+        disabled_columns=_DISABLED_COLUMNS,
+        on_change=_sync_selection,
+        args=(editor_key, df_page['_uuid'].tolist())
+    )
 
     # Port usage summary
     st.divider()
-    used_ports = manager.get_used_ports()
-    st.caption(f"**Ports in use:** {', '.join(map(str, used_ports[:15]))}" +
-               (f" ... ({len(used_ports)} total)" if len(used_ports) > 15 else ""))
-
-    next_port = manager.suggest_next_port()
-    st.caption(f"**Next available port:** {next_port}")
+    st.caption(_cached_port_caption(manager, id(manager), manager.rules_version))
@@ -1,6 +1,7 @@
 """
 Theme and styling configuration
 """
+import re
 
 # Color palette
 COLORS = {
@@ -16,6 +17,30 @@ COLORS = {
     "text_light": "#808495",
 }
 
+# Status lookups
+STATUS_ICONS = {
+    "running": "✅",
+    "stopped": "⏸️",
+    "error": "❌",
+    "warning": "⚠️",
+    "unknown": "❓",
+    "success": "✅",
+}
+
+STATUS_COLORS = {
+    "running": COLORS["success"],
+    "stopped": COLORS["error"],
+    "error": COLORS["error"],
+    "warning": COLORS["warning"],
+    "unknown": COLORS["text_light"],
+    "success": COLORS["success"],
+}
+
+STATUS_INFO = {
+    status: (STATUS_ICONS[status], STATUS_COLORS[status])
+    for status in STATUS_ICONS
+}
+
 # Custom CSS styles
 CUSTOM_CSS = """
 <style>
@@ -178,34 +203,31 @@ CUSTOM_CSS = """
 </style>
 """
 
+# Whitespace-collapsed CSS, computed once at import to shrink the per-run payload
+CUSTOM_CSS_MIN = re.sub(r'\s+', ' ', CUSTOM_CSS).strip()
+
 
 def apply_custom_theme():
     """Apply custom theme to the Streamlit app"""
     import streamlit as st
-    st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
+    st.markdown(CUSTOM_CSS_MIN, unsafe_allow_html=True)
+
+
+def _normalize_status(status):
+    """Lowercase status only when needed, avoiding a new string in the common case"""
+    return status if status.islower() else status.lower()
 
 
 def get_status_icon(status):
     """Get icon for status"""
-    status_icons = {
-        "running": "✅",
-        "stopped": "⏸️",
-        "error": "❌",
-        "warning": "⚠️",
-        "unknown": "❓",
-        "success": "✅",
-    }
-    return status_icons.get(status.lower(), "❓")
+    return STATUS_ICONS.get(_normalize_status(status), "❓")
 
 
 def get_status_color(status):
     """Get color for status"""
-    status_colors = {
-        "running": COLORS["success"],
-        "stopped": COLORS["error"],
-        "error": COLORS["error"],
-        "warning": COLORS["warning"],
-        "unknown": COLORS["text_light"],
-        "success": COLORS["success"],
-    }
-    return status_colors.get(status.lower(), COLORS["text"])
+    return STATUS_COLORS.get(_normalize_status(status), COLORS["text"])
+
+
+def get_status_info(status):
+    """Get (icon, color) for status in a single lookup"""
+    return STATUS_INFO.get(_normalize_status(status), ("❓", COLORS["text"]))
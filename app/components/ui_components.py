@@ -3,6 +3,20 @@ Reusable UI components for consistent styling
 """
 import streamlit as st
 
+# HTML templates, built once at import and filled with str.format
+_EMPTY_STATE_HTML = (
+    '<div style="text-align: center; padding: 2rem;">'
+    '<div style="font-size: 4rem;">{icon}</div>'
+    '<p style="font-size: 1.2rem; color: #666;">{message}</p>'
+    '</div>'
+)
+
+_CARD_HTML = (
+    '<div style="background-color: {bg_color}; padding: 1rem; border-radius: 0.5rem; margin: 0.5rem 0;">'
+    '<h4>{prefix}{title}</h4>'
+    '</div>'
+)
+
 
 def metric_card(label, value, delta=None, delta_color="normal", help_text=None):
     """
@@ -122,7 +136,7 @@ def confirmation_dialog(message, confirm_label="Yes", cancel_label="No", confirm
     return confirm, cancel
 
 
-def data_table(df, key, column_config=None, disabled_columns=None, hide_index=True):
+def data_table(df, key, column_config=None, disabled_columns=None, hide_index=True, on_change=None, args=None):
     """
     Display an editable data table with consistent styling
 
@@ -132,6 +146,8 @@ def data_table(df, key, column_config=None, disabled_columns=None, hide_index=Tr
         column_config: Column configuration dict
         disabled_columns: List of columns to disable editing
         hide_index: Whether to hide the index
+        on_change: Optional callback when the table is edited
+        args: Optional tuple of args to pass to the callback
 
     Returns:
         Edited DataFrame
@@ -142,10 +158,51 @@ def data_table(df, key, column_config=None, disabled_columns=None, hide_index=Tr
         use_container_width=True,
         column_config=column_config,
         disabled=disabled_columns,
-        key=key
+        key=key,
+        on_change=on_change,
+        args=args
     )
 
 
+def paginate(df, key, page_size=50, on_page_change=None):
+    """
+    Slice a DataFrame to the current page, with Previous/Next controls when needed
+
+    Args:
+        df: DataFrame to paginate
+        key: Unique key; the page index is kept in st.session_state[key]
+        page_size: Rows per page
+        on_page_change: Optional callback when the page changes
+
+    Returns:
+        DataFrame slice for the current page
+    """
+    page_count = max(1, -(-len(df) // page_size))
+
+    # Clicks are applied in callbacks, before the rerun draws anything,
+    # so the caption and disabled states below always match the page shown
+    def turn(step):
+        def callback():
+            current = min(st.session_state.get(key, 0), page_count - 1)
+            st.session_state[key] = min(max(current + step, 0), page_count - 1)
+            if on_page_change:
+                on_page_change()
+        return callback
+
+    page = min(max(st.session_state.get(key, 0), 0), page_count - 1)
+    st.session_state[key] = page
+
+    if page_count > 1:
+        with st.container(horizontal=True, vertical_alignment="center"):
+            action_button("Previous", key=f"{key}_prev", icon="◀️", type="secondary",
+                          disabled=page == 0, on_click=turn(-1))
+            st.caption(f"Page {page + 1} of {page_count}")
+            action_button("Next", key=f"{key}_next", icon="▶️", type="secondary",
+                          disabled=page >= page_count - 1, on_click=turn(1))
+
+    return df.iloc[page * page_size:(page + 1) * page_size]
+
+
 def stats_row(stats_dict):
     """
     Display a row of statistics/metrics
@@ -235,12 +292,7 @@ def empty_state(message, icon="📭", action_label=None, action_callback=None):
 
     with col2:
         st.markdown(
-            f"""
-            <div style="text-align: center; padding: 2rem;">
-                <div style="font-size: 4rem;">{icon}</div>
-                <p style="font-size: 1.2rem; color: #666;">{message}</p>
-            </div>
-            """,
+            _EMPTY_STATE_HTML.format(icon=icon, message=message),
             unsafe_allow_html=True
         )
 
@@ -262,11 +314,7 @@ def card(title, content=None, icon=None, color=None):
     bg_color = color or "#f0f2f6"
 
     st.markdown(
-        f"""
-        <div style="background-color: {bg_color}; padding: 1rem; border-radius: 0.5rem; margin: 0.5rem 0;">
-            <h4>{icon + ' ' if icon else ''}{title}</h4>
-        </div>
-        """,
+        _CARD_HTML.format(bg_color=bg_color, prefix=icon + ' ' if icon else '', title=title),
         unsafe_allow_html=True
     )
 
@@ -4,23 +4,54 @@ Streamlit UI for managing docker-compose services and reverse proxy rules
 """
 import streamlit as st
 import pandas as pd
+import operator
 import os
+import types
+from concurrent.futures import ThreadPoolExecutor
+from functools import reduce
 from pathlib import Path
 from dotenv import load_dotenv
 from modules.inventory import InfrastructureInventory
 from modules.reverse_proxy import SynologyReverseProxyManager
 from components.theme import apply_custom_theme
-from components.proxy_components import proxy_rules_table
+from components.proxy_components import proxy_rules_table, cached_rules, port_summary
 from components.ui_components import (
     section_header,
     stats_row,
     action_button,
     empty_state,
-    metric_card
+    metric_card,
+    paginate
 )
 
-# Load environment variables from .env file
-load_dotenv()
+# Concurrent add_rule requests when auto-creating missing proxies
+AUTO_CREATE_WORKERS = 4
+
+# Rows sent to the browser per table page
+TABLE_PAGE_SIZE = 50
+
+
+@st.cache_resource(show_spinner=False)
+def load_config():
+    """
+    Load settings from the environment / .env file once per process
+
+    Streamlit re-executes this script on every rerun, so the values are
+    cached rather than re-read (and .env re-parsed) each time.
+    """
+    load_dotenv()
+    return types.SimpleNamespace(
+        dashboard_password=os.getenv("DASHBOARD_PASSWORD", ""),
+        portainer_host=os.getenv("PORTAINER_HOST", "notmyproblemnas"),
+        portainer_port=os.getenv("PORTAINER_PORT", "9000"),
+        portainer_username=os.getenv("PORTAINER_USERNAME", "admin"),
+        portainer_password=os.getenv("PORTAINER_PASSWORD", ""),
+        synology_host=os.getenv("SYNOLOGY_HOST", "notmyproblemnas"),
+        synology_port=os.getenv("SYNOLOGY_PORT", "5000"),
+        synology_username=os.getenv("SYNOLOGY_USERNAME", "akib_admin"),
+        synology_password=os.getenv("SYNOLOGY_PASSWORD", ""),
+    )
+
 
 # Page configuration
 st.set_page_config(
@@ -30,6 +61,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Load environment variables from .env file
+CONFIG = load_config()
+
 # Apply custom theme
 apply_custom_theme()
 
@@ -61,7 +95,7 @@ def dashboard_login():
         st.markdown("---")
 
         # Check if dashboard password is configured
-        dashboard_password = os.getenv("DASHBOARD_PASSWORD", "")
+        dashboard_password = CONFIG.dashboard_password
 
         if not dashboard_password:
             st.error("⚠️ Dashboard password not configured in .env file")
@@ -97,6 +131,109 @@ def dashboard_login():
         st.caption(f"Login attempts: {st.session_state.login_attempts}/5")
 
 
+@st.cache_resource(show_spinner=False)
+def get_inventory(host, port, username, password):
+    """
+    Authenticated Portainer inventory shared by all sessions per login
+
+    Only the login is cached; callers scan, so "Scan Portainer" always rescans.
+
+    Raises:
+        ConnectionError: If authentication fails, so the failure is not cached
+    """
+    inventory = InfrastructureInventory(host, port, username, password)
+    if not inventory.is_authenticated():
+        raise ConnectionError(inventory.get_error_message())
+    return inventory
+
+
+@st.cache_resource(show_spinner=False)
+def get_proxy_manager(host, port, username, password):
+    """
+    Authenticated Synology reverse proxy manager shared by all sessions per login
+
+    Raises:
+        ConnectionError: If authentication fails, so the failure is not cached
+    """
+    manager = SynologyReverseProxyManager(host, port, username, password)
+    if not manager.authenticated:
+        raise ConnectionError(manager.error_message)
+    return manager
+
+
+def connect_portainer_from_env():
+    """Connect to Portainer with .env credentials and scan; returns the inventory or None"""
+    try:
+        inventory = get_inventory(
+            CONFIG.portainer_host,
+            CONFIG.portainer_port,
+            CONFIG.portainer_username,
+            CONFIG.portainer_password
+        )
+        # Sessions joining an already-scanned shared inventory reuse its scan
+        if not inventory.version:
+            inventory.scan_stacks()
+        return inventory
+    except Exception:
+        pass  # Silently fail auto-connect, user can manually connect
+    return None
+
+
+def connect_synology_from_env():
+    """Connect to Synology with .env credentials; returns the manager or None"""
+    try:
+        return get_proxy_manager(
+            CONFIG.synology_host,
+            CONFIG.synology_port,
+            CONFIG.synology_username,
+            CONFIG.synology_password
+        )
+    except Exception:
+        pass  # Silently fail auto-connect, user can manually connect
+    return None
+
+
+def auto_connect():
+    """
+    Auto-connect to Portainer and Synology once per session
+
+    Both logins are independent network round trips, so they run in
+    parallel threads and the first load waits for the slower one rather
+    than for both in sequence.
+    """
+    tasks = {}
+    portainer_attempted = st.session_state.setdefault('portainer_auto_connect_attempted', False)
+    synology_attempted = st.session_state.setdefault('synology_auto_connect_attempted', False)
+
+    if not st.session_state.portainer_connected and not portainer_attempted:
+        if CONFIG.portainer_password:
+            st.session_state.portainer_auto_connect_attempted = True
+            tasks['portainer'] = connect_portainer_from_env
+
+    if not st.session_state.authenticated and not synology_attempted:
+        if CONFIG.synology_password:
+            st.session_state.synology_auto_connect_attempted = True
+            tasks['synology'] = connect_synology_from_env
+
+    if not tasks:
+        return
+
+    with st.spinner(f"Auto-connecting to {' and '.join(name.title() for name in tasks)}..."):
+        with ThreadPoolExecutor(max_workers=len(tasks)) as pool:
+            futures = {name: pool.submit(task) for name, task in tasks.items()}
+        results = {name: future.result() for name, future in futures.items()}
+
+    inventory = results.get('portainer')
+    if inventory:
+        st.session_state.inventory = inventory
+        st.session_state.portainer_connected = True
+
+    manager = results.get('synology')
+    if manager:
+        st.session_state.proxy_manager = manager
+        st.session_state.authenticated = True
+
+
 def sidebar_config():
     """Sidebar configuration and authentication"""
     st.sidebar.title("⚙️ Configuration")
@@ -112,35 +249,20 @@ def sidebar_config():
 
     st.sidebar.divider()
 
-    # Auto-connect to Portainer if credentials are available
-    if not st.session_state.portainer_connected and 'portainer_auto_connect_attempted' not in st.session_state:
-        portainer_password = os.getenv("PORTAINER_PASSWORD", "")
-        if portainer_password:
-            st.session_state.portainer_auto_connect_attempted = True
-            with st.spinner("Auto-connecting to Portainer..."):
-                try:
-                    inventory = InfrastructureInventory(
-                        os.getenv("PORTAINER_HOST", "notmyproblemnas"),
-                        os.getenv("PORTAINER_PORT", "9000"),
-                        os.getenv("PORTAINER_USERNAME", "admin"),
-                        portainer_password
-                    )
-                    if inventory.is_authenticated():
-                        inventory.scan_stacks()
-                        st.session_state.inventory = inventory
-                        st.session_state.portainer_connected = True
-                        st.rerun()
-                except Exception:
-                    pass  # Silently fail auto-connect, user can manually connect
+    # Auto-connect to Portainer and Synology if credentials are available
+    auto_connect()
+
+    portainer_connected = st.session_state.portainer_connected
+    authenticated = st.session_state.authenticated
 
     # Portainer connection
     st.sidebar.subheader("Portainer Connection")
 
-    with st.sidebar.expander("Portainer Settings", expanded=not st.session_state.portainer_connected):
-        portainer_host = st.text_input("Portainer Host", value=os.getenv("PORTAINER_HOST", "notmyproblemnas"))
-        portainer_port = st.text_input("Portainer Port", value=os.getenv("PORTAINER_PORT", "9000"))
-        portainer_username = st.text_input("Portainer Username", value=os.getenv("PORTAINER_USERNAME", "admin"))
-        portainer_password = st.text_input("Portainer Password", type="password", value=os.getenv("PORTAINER_PASSWORD", ""))
+    with st.sidebar.expander("Portainer Settings", expanded=not portainer_connected):
+        portainer_host = st.text_input("Portainer Host", value=CONFIG.portainer_host)
+        portainer_port = st.text_input("Portainer Port", value=CONFIG.portainer_port)
+        portainer_username = st.text_input("Portainer Username", value=CONFIG.portainer_username)
+        portainer_password = st.text_input("Portainer Password", type="password", value=CONFIG.portainer_password)
 
         if st.button("🔍 Scan Portainer", width="stretch"):
             if not portainer_password:
@@ -148,63 +270,41 @@ def sidebar_config():
             else:
                 with st.spinner("Connecting to Portainer and scanning containers..."):
                     try:
-                        inventory = InfrastructureInventory(
+                        inventory = get_inventory(
                             portainer_host,
                             portainer_port,
                             portainer_username,
                             portainer_password
                         )
-
-                        if not inventory.is_authenticated():
-                            st.error(f"Portainer connection failed: {inventory.get_error_message()}")
-                        else:
-                            inventory.scan_stacks()
-                            st.session_state.inventory = inventory
-                            st.session_state.portainer_connected = True
-                            st.success(f"✅ Found {len(inventory.services)} services")
-                            st.rerun()
+                        inventory.scan_stacks()
+                        st.session_state.inventory = inventory
+                        st.session_state.portainer_connected = True
+                        portainer_connected = True
+                        st.success(f"✅ Found {len(inventory.services)} services")
+                    except ConnectionError as e:
+                        st.error(f"Portainer connection failed: {e}")
                     except Exception as e:
                         st.error(f"Scan failed: {str(e)}")
 
-    if st.session_state.portainer_connected:
+    if portainer_connected:
         st.sidebar.success("✅ Connected to Portainer")
         if st.sidebar.button("🔄 Refresh Inventory", width="stretch"):
-            if st.session_state.inventory:
+            inventory = st.session_state.inventory
+            if inventory:
                 with st.spinner("Refreshing..."):
-                    st.session_state.inventory.scan_stacks()
+                    inventory.scan_stacks()
                     st.success("Refreshed!")
-                    st.rerun()
 
     st.sidebar.divider()
 
-    # Auto-connect to Synology if credentials are available
-    if not st.session_state.authenticated and 'synology_auto_connect_attempted' not in st.session_state:
-        synology_password = os.getenv("SYNOLOGY_PASSWORD", "")
-        if synology_password:
-            st.session_state.synology_auto_connect_attempted = True
-            with st.spinner("Auto-connecting to Synology..."):
-                try:
-                    manager = SynologyReverseProxyManager(
-                        os.getenv("SYNOLOGY_HOST", "notmyproblemnas"),
-                        os.getenv("SYNOLOGY_PORT", "5000"),
-                        os.getenv("SYNOLOGY_USERNAME", "akib_admin"),
-                        synology_password
-                    )
-                    if manager.authenticated:
-                        st.session_state.proxy_manager = manager
-                        st.session_state.authenticated = True
-                        st.rerun()
-                except Exception:
-                    pass  # Silently fail auto-connect, user can manually connect
-
     # Synology connection
     st.sidebar.subheader("Synology Connection")
 
-    with st.sidebar.expander("Connection Settings", expanded=not st.session_state.authenticated):
-        host = st.text_input("Host", value=os.getenv("SYNOLOGY_HOST", "notmyproblemnas"))
-        port = st.text_input("Port", value=os.getenv("SYNOLOGY_PORT", "5000"))
-        username = st.text_input("Username", value=os.getenv("SYNOLOGY_USERNAME", "akib_admin"))
-        password = st.text_input("Password", type="password", value=os.getenv("SYNOLOGY_PASSWORD", ""))
+    with st.sidebar.expander("Connection Settings", expanded=not authenticated):
+        host = st.text_input("Host", value=CONFIG.synology_host)
+        port = st.text_input("Port", value=CONFIG.synology_port)
+        username = st.text_input("Username", value=CONFIG.synology_username)
+        password = st.text_input("Password", type="password", value=CONFIG.synology_password)
 
         if st.button("🔐 Connect", width="stretch"):
             if not password:
@@ -212,24 +312,173 @@ def sidebar_config():
             else:
                 with st.spinner("Connecting to Synology..."):
                     try:
-                        manager = SynologyReverseProxyManager(host, port, username, password)
-                        if manager.authenticated:
-                            st.session_state.proxy_manager = manager
-                            st.session_state.authenticated = True
-                            st.success("Connected successfully!")
-                            st.rerun()
-                        else:
-                            st.error(f"Authentication failed: {manager.error_message}")
+                        manager = get_proxy_manager(host, port, username, password)
+                        st.session_state.proxy_manager = manager
+                        st.session_state.authenticated = True
+                        authenticated = True
+                        st.success("Connected successfully!")
+                    except ConnectionError as e:
+                        st.error(f"Authentication failed: {e}")
                     except Exception as e:
                         st.error(f"Connection error: {str(e)}")
 
-    if st.session_state.authenticated:
+    if authenticated:
         st.sidebar.success("✅ Connected to Synology")
         if st.sidebar.button("🔓 Disconnect", width="stretch"):
+            get_proxy_manager.clear()  # Next connect logs in again
             st.session_state.proxy_manager = None
             st.session_state.authenticated = False
             st.rerun()
 
+    st.sidebar.divider()
+
+    # Debug output is off by default to keep reruns lightweight
+    st.sidebar.toggle("🐞 Debug mode", key="debug_mode", help="Show raw API responses")
+
+
+def format_ports(all_ports, proxy_port):
+    """Format a service's published ports, highlighting the proxy port"""
+    if not all_ports:
+        return 'N/A'
+    if len(all_ports) == 1:
+        return str(all_ports[0])
+
+    # Show all ports, highlight the proxy port
+    ports_str = ', '.join(str(p) for p in all_ports)
+    if proxy_port in all_ports:
+        ports_str = f"{ports_str} (→{proxy_port})"
+    return ports_str
+
+
+@st.cache_data(show_spinner=False)
+def cached_services_dataframe(_inventory, inventory_id, version):
+    """Services table for an inventory, rebuilt only when a scan bumps its version"""
+    return services_dataframe(_inventory.services)
+
+
+def services_dataframe(services):
+    """
+    Build the services overview table from the inventory
+
+    Columns are derived with vectorized pandas operations over one raw
+    frame instead of building a dict per service.
+
+    Args:
+        services: InfrastructureInventory.services dict
+
+    Returns:
+        DataFrame with one row per service
+    """
+    # Only the fields the table uses, as tuples: no per-row key inference and
+    # no wide columns (labels) that are dropped straight away
+    raw = pd.DataFrame.from_records(
+        ((name, info.get('state'), info.get('service_name'), info.get('container_name'),
+          info.get('stack_dir'), info.get('image'), info.get('needs_proxy'))
+         for name, info in services.items()),
+        columns=['name', 'state', 'service_name', 'container_name', 'stack_dir', 'image', 'needs_proxy'],
+        nrows=len(services)
+    ).set_index('name')
+    names = raw.index.to_series()
+
+    df = pd.DataFrame({
+        'State': raw['state'].map({'running': '✅', 'exited': '⏸️'}).fillna('❓'),
+        'Service': raw['service_name'].fillna(names),
+        'Container': raw['container_name'].fillna(names),
+        'Stack': raw['stack_dir'].fillna('N/A'),
+        # Read from the dicts: a None proxy port would turn the column into floats
+        'Ports': [format_ports(info.get('ports', []), info.get('port')) for info in services.values()],
+        'Image': raw['image'].fillna('N/A').str.split(':', n=1).str[0],
+        'Needs Proxy': raw['needs_proxy'].astype(bool).map({True: '✅', False: '❌'})
+    }).reset_index(drop=True)
+
+    # Lowercased search haystack so filtering is one literal scan per keystroke;
+    # Arrow-backed so str.contains runs in Arrow compute rather than per object
+    df['_search'] = (
+        df['Service'].astype(str).str.lower() + '\x1f' + df['Container'].astype(str).str.lower()
+    ).astype('string[pyarrow]')
+    return df
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def to_csv_bytes(_df, inventory_id, version, filters):
+    """
+    CSV export bytes for a filtered services view
+
+    Keyed on the inventory version and filter values rather than the frame
+    itself, so a cache hit costs no hashing of the rows. Internal columns
+    (prefixed with ``_``) are left out of the export.
+    """
+    columns = [col for col in _df.columns if not str(col).startswith('_')]
+    return _df.to_csv(index=False, columns=columns).encode()
+
+
+@st.fragment
+def services_table(inventory):
+    """
+    Filterable services table with CSV export
+
+    Runs as a fragment so changing a filter or typing a search only reruns
+    this block, not the sidebar and the rest of the page.
+
+    Args:
+        inventory: InfrastructureInventory instance
+    """
+    # Convert to DataFrame (cached per scan; only the filters below run on rerun)
+    df = cached_services_dataframe(inventory, id(inventory), inventory.version)
+
+    # Filters
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        filter_state = st.selectbox(
+            "Filter by State",
+            options=["All", "Running", "Stopped"]
+        )
+    with col2:
+        filter_proxy = st.selectbox(
+            "Filter by Proxy Need",
+            options=["All", "Needs Proxy", "No Proxy"]
+        )
+    with col3:
+        search = st.text_input("Search services", "")
+
+    # Apply filters - the cached frame is passed through untouched when none are active
+    masks = []
+    if filter_state == "Running":
+        masks.append(df['State'] == '✅')
+    elif filter_state == "Stopped":
+        masks.append(df['State'] != '✅')
+
+    if filter_proxy == "Needs Proxy":
+        masks.append(df['Needs Proxy'] == '✅')
+    elif filter_proxy == "No Proxy":
+        masks.append(df['Needs Proxy'] == '❌')
+
+    if search:
+        masks.append(df['_search'].str.contains(search.lower(), regex=False, na=False))
+
+    view = df.loc[reduce(operator.and_, masks)] if masks else df
+
+    # Display table - only the visible page is sent; the export keeps every row
+    st.dataframe(
+        paginate(view, 'inventory_page', TABLE_PAGE_SIZE),
+        width="stretch",
+        hide_index=True,
+        column_config={"_search": None}
+    )
+
+    # Export options
+    st.divider()
+    col1, col2 = st.columns([3, 1])
+    with col2:
+        csv = to_csv_bytes(view, id(inventory), inventory.version, (filter_state, filter_proxy, search.lower()))
+        st.download_button(
+            label="📥 Export CSV",
+            data=csv,
+            file_name="infrastructure_inventory.csv",
+            mime="text/csv",
+            width="stretch"
+        )
+
 
 def inventory_tab():
     """Inventory management tab"""
@@ -272,102 +521,26 @@ def inventory_tab():
     conflicts = inventory.check_port_conflicts()
     if conflicts:
         st.subheader("⚠️ Port Conflicts")
-        for port, services in conflicts.items():
-            st.error(f"**Port {port}** is used by: {', '.join(services)}")
+        st.error("\n".join(
+            f"- **Port {port}** is used by: {', '.join(services)}"
+            for port, services in conflicts.items()
+        ))
         st.divider()
 
     # Services table
     st.subheader("Services Overview")
 
-    # Convert to DataFrame
-    services_data = []
-    for name, info in inventory.services.items():
-        state = info.get('state', 'unknown')
-        state_icon = '✅' if state == 'running' else '⏸️' if state == 'exited' else '❓'
-
-        # Get all ports and proxy port
-        all_ports = info.get('ports', [])
-        proxy_port = info.get('port')
-
-        # Format ports display
-        if all_ports:
-            if len(all_ports) > 1:
-                # Show all ports, highlight the proxy port
-                ports_str = ', '.join(str(p) for p in all_ports)
-                if proxy_port in all_ports:
-                    ports_str = f"{ports_str} (→{proxy_port})"
-            else:
-                ports_str = str(all_ports[0])
-        else:
-            ports_str = 'N/A'
-
-        services_data.append({
-            'State': state_icon,
-            'Service': info.get('service_name', name),
-            'Container': info.get('container_name', name),
-            'Stack': info.get('stack_dir', 'N/A'),
-            'Ports': ports_str,
-            'Image': info.get('image', 'N/A').split(':')[0] if info.get('image') else 'N/A',
-            'Needs Proxy': '✅' if info.get('needs_proxy') else '❌'
-        })
-
-    df = pd.DataFrame(services_data)
-
-    # Filters
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        filter_state = st.selectbox(
-            "Filter by State",
-            options=["All", "Running", "Stopped"]
-        )
-    with col2:
-        filter_proxy = st.selectbox(
-            "Filter by Proxy Need",
-            options=["All", "Needs Proxy", "No Proxy"]
-        )
-    with col3:
-        search = st.text_input("Search services", "")
-
-    # Apply filters
-    if filter_state == "Running":
-        df = df[df['State'] == '✅']
-    elif filter_state == "Stopped":
-        df = df[df['State'] != '✅']
-
-    if filter_proxy == "Needs Proxy":
-        df = df[df['Needs Proxy'] == '✅']
-    elif filter_proxy == "No Proxy":
-        df = df[df['Needs Proxy'] == '❌']
-
-    if search:
-        df = df[df['Service'].str.contains(search, case=False) | df['Container'].str.contains(search, case=False)]
-
-    # Display table
-    st.dataframe(
-        df,
-        width="stretch",
-        hide_index=True
-    )
-
-    # Export options
-    st.divider()
-    col1, col2 = st.columns([3, 1])
-    with col2:
-        csv = df.to_csv(index=False)
-        st.download_button(
-            label="📥 Export CSV",
-            data=csv,
-            file_name="infrastructure_inventory.csv",
-            mime="text/csv",
-            width="stretch"
-        )
+    services_table(inventory)
 
 
 def proxy_tab():
     """Reverse proxy management tab"""
     section_header("Reverse Proxy Manager", "Manage Synology reverse proxy rules", icon="🌐")
 
-    if not st.session_state.authenticated:
+    authenticated = st.session_state.authenticated
+    manager = st.session_state.proxy_manager
+
+    if not authenticated:
         empty_state(
             "Connect to Synology in the sidebar to manage reverse proxy rules",
             icon="🔐",
@@ -375,8 +548,6 @@ def proxy_tab():
         )
         return
 
-    manager = st.session_state.proxy_manager
-
     # Tabs for different operations
     proxy_subtab1, proxy_subtab2 = st.tabs(["📋 Current Rules", "➕ Add New Rule"])
 
@@ -401,89 +572,103 @@ def add_new_rule_form(manager):
         manager.list_rules(refresh=True)
         st.session_state.last_rules_refresh = True
 
-    # Use columns for side-by-side layout
-    col1, col2 = st.columns(2)
-
-    with col1:
-        description = st.text_input(
-            "Service Name *",
-            placeholder="e.g., bazarr",
-            help="Unique identifier for this rule",
-            key="new_rule_description"
-        )
-
-        frontend_domain = st.text_input(
-            "Frontend Domain *",
-            placeholder="e.g., bazarr.akibrhast.synology.me",
-            help="Full domain name for HTTPS access",
-            key="new_rule_domain"
-        )
-
-        backend_host = st.text_input(
-            "Backend Host *",
-            value="notmyproblemnas",
-            help="Hostname or IP of the backend service",
-            key="new_rule_host"
-        )
+    # Inputs live in a form so typing doesn't rerun the script; validation
+    # runs once when the form is submitted
+    with st.form("new_rule_form"):
+        # Use columns for side-by-side layout
+        col1, col2 = st.columns(2)
+
+        with col1:
+            description = st.text_input(
+                "Service Name *",
+                placeholder="e.g., bazarr",
+                help="Unique identifier for this rule",
+                key="new_rule_description"
+            )
+
+            frontend_domain = st.text_input(
+                "Frontend Domain *",
+                placeholder="e.g., bazarr.akibrhast.synology.me",
+                help="Full domain name for HTTPS access",
+                key="new_rule_domain"
+            )
+
+            backend_host = st.text_input(
+                "Backend Host *",
+                value="notmyproblemnas",
+                help="Hostname or IP of the backend service",
+                key="new_rule_host"
+            )
+
+        with col2:
+            frontend_port = st.number_input(
+                "Frontend Port (Source) *",
+                min_value=1,
+                max_value=65535,
+                value=443,
+                help="HTTPS port that users connect to (usually 443)",
+                key="new_rule_frontend_port"
+            )
+
+            _, suggested_port = port_summary(manager)
+            backend_port = st.number_input(
+                "Backend Port (Destination) *",
+                min_value=1,
+                max_value=65535,
+                value=suggested_port,
+                help="Port where the service is running",
+                key="new_rule_backend_port"
+            )
+
+            hsts = st.checkbox("Enable HSTS", value=True, help="HTTP Strict Transport Security", key="new_rule_hsts")
+            websocket = st.checkbox("Enable WebSocket", value=False, help="For services requiring WebSocket support", key="new_rule_ws")
 
-    with col2:
-        frontend_port = st.number_input(
-            "Frontend Port (Source) *",
-            min_value=1,
-            max_value=65535,
-            value=443,
-            help="HTTPS port that users connect to (usually 443)",
-            key="new_rule_frontend_port"
-        )
+        st.divider()
 
-        suggested_port = manager.suggest_next_port()
-        backend_port = st.number_input(
-            "Backend Port (Destination) *",
-            min_value=1,
-            max_value=65535,
-            value=suggested_port,
-            help="Port where the service is running",
-            key="new_rule_backend_port"
-        )
+        col_btn1, col_btn2, col_btn3 = st.columns([2, 1, 2])
+        with col_btn2:
+            create_clicked = st.form_submit_button(
+                "✅ Create Rule",
+                use_container_width=True,
+                type="primary"
+            )
 
-        hsts = st.checkbox("Enable HSTS", value=True, help="HTTP Strict Transport Security", key="new_rule_hsts")
-        websocket = st.checkbox("Enable WebSocket", value=False, help="For services requiring WebSocket support", key="new_rule_ws")
+    if not create_clicked:
+        return
 
-    # Real-time validation (shows as user types)
-    has_errors = False
+    # Validate the submitted values; the manager's lookups share one index per rules snapshot
     is_valid = True
 
     # Check required fields
     if not description or not frontend_domain or not backend_host:
+        st.error("❌ Please fill in all required fields")
         is_valid = False
 
     # Check domain:port conflict (BLOCKER - same domain CAN be used with different ports)
     if frontend_domain and frontend_port:
-        # Get all rules and check for conflicts
-        rules = manager.list_rules()
-
-        # Debug: Show total rules loaded
-        st.caption(f"🔍 Debug: Total rules loaded: {len(rules)}")
-
-        matching_domain_rules = [r for r in rules if r.get("frontend", {}).get("fqdn") == frontend_domain]
-
-        # Debug output - always show for debugging
-        if matching_domain_rules:
-            st.warning(f"🔍 Debug: Found {len(matching_domain_rules)} existing rules for domain '{frontend_domain}'")
-            for rule in matching_domain_rules:
-                existing_port = rule.get("frontend", {}).get("port")
-                st.caption(f"  - Existing: {rule.get('description')} on port {existing_port} (type: {type(existing_port).__name__})")
-            st.caption(f"  - Checking: port {frontend_port} (type: {type(frontend_port).__name__})")
-        else:
-            st.caption(f"🔍 Debug: No existing rules found for domain '{frontend_domain}'")
+        matching_domain_rules = manager.get_domain_rules(frontend_domain)
 
         # Check if exact domain:port exists
         conflict_exists = manager.domain_port_exists(frontend_domain, frontend_port)
-        st.caption(f"🔍 Debug: domain_port_exists() returned: {conflict_exists}")
+
+        # Debug output (only when debug mode is enabled in the sidebar)
+        if st.session_state.get('debug_mode'):
+            with st.expander("🔍 Debug: Rule validation", expanded=False):
+                st.caption(f"Total rules loaded: {len(cached_rules(manager))}")
+                if matching_domain_rules:
+                    st.caption(f"Found {len(matching_domain_rules)} existing rules for domain '{frontend_domain}'")
+                    existing = [(r.get('description'), r.get("frontend", {}).get("port")) for r in matching_domain_rules]
+                    st.caption("  \n".join(
+                        f"  - Existing: {desc} on port {port} (type: {type(port).__name__})"
+                        for desc, port in existing
+                    ))
+                    st.caption(f"  - Checking: port {frontend_port} (type: {type(frontend_port).__name__})")
+                else:
+                    st.caption(f"No existing rules found for domain '{frontend_domain}'")
+                st.caption(f"domain:port exists: {conflict_exists}")
 
         if conflict_exists:
             st.error(f"❌ Domain '{frontend_domain}:{frontend_port}' already exists")
-            has_errors = True
             is_valid = False
         elif matching_domain_rules:
             # Same domain exists on different port - show info with details
@@ -498,58 +683,76 @@ def add_new_rule_form(manager):
     if backend_port:
         conflicts = manager.get_port_conflicts(backend_port)
         if conflicts:
-            st.info(f"ℹ️ Backend port {backend_port} is already used by:")
-            for conflict in conflicts:
-                st.caption(f"  • {conflict['description']} ({conflict['domain']})")
-
-    st.divider()
-
-    # Create button - disabled until all fields valid and no errors
-    col_btn1, col_btn2, col_btn3 = st.columns([2, 1, 2])
-    with col_btn2:
-        create_clicked = st.button(
-            "✅ Create Rule",
-            width="stretch",
-            disabled=not is_valid,
-            type="primary"
+            st.info(f"ℹ️ Backend port {backend_port} is already used by:\n" + "\n".join(
+                f"- {conflict['description']} ({conflict['domain']})" for conflict in conflicts
+            ))
+
+    if is_valid:
+        with st.spinner("Creating rule..."):
+            success, message = manager.add_rule(
+                description=description,
+                frontend_domain=frontend_domain,
+                backend_host=backend_host,
+                backend_port=backend_port,
+                frontend_port=frontend_port,
+                hsts=hsts,
+                websocket=websocket
+            )
+
+            if success:
+                st.success(f"✅ {message}")
+                st.balloons()
+                # Clear the form by resetting session state
+                for key in ['new_rule_description', 'new_rule_domain', 'new_rule_host',
+                            'new_rule_frontend_port', 'new_rule_backend_port', 'new_rule_hsts', 'new_rule_ws']:
+                    if key in st.session_state:
+                        del st.session_state[key]
+                st.rerun()
+            else:
+                st.error(f"❌ {message}")
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_sync_report(_manager, _inventory, manager_id, rules_version, inventory_id, inventory_version):
+    """
+    Sync report and its tables, rebuilt only when the rules or inventory change
+
+    Uses the manager's cached rules; the Refresh Sync button re-fetches them,
+    which bumps rules_version and invalidates this entry.
+
+    Returns:
+        Dict with the raw report plus 'missing', 'orphaned' and 'sync' DataFrames
+    """
+    report = _manager.generate_sync_report(_inventory.services, refresh=False)
+
+    return {
+        'report': report,
+        'missing': pd.DataFrame.from_records(
+            [(item['service'], item['port'], item['stack'], f"{item['service']}.akibrhast.synology.me")
+             for item in report['missing_proxies']],
+            columns=['Service', 'Port', 'Stack', 'Suggested Domain']
+        ),
+        'orphaned': pd.DataFrame.from_records(
+            [(item['id'], item['description'], item['domain'], item['port'])
+             for item in report['orphaned_proxies']],
+            columns=['ID', 'Description', 'Domain', 'Port']
+        ),
+        'sync': pd.DataFrame.from_records(
+            [(item['service'], item['port'], item['domain']) for item in report['in_sync']],
+            columns=['Service', 'Port', 'Domain']
         )
-
-    if create_clicked:
-        # Validate required fields
-        if not description or not frontend_domain or not backend_host:
-            st.error("❌ Please fill in all required fields")
-        elif manager.domain_port_exists(frontend_domain, frontend_port):
-            st.error(f"❌ Domain '{frontend_domain}:{frontend_port}' already exists")
-        else:
-            with st.spinner("Creating rule..."):
-                success, message = manager.add_rule(
-                    description=description,
-                    frontend_domain=frontend_domain,
-                    backend_host=backend_host,
-                    backend_port=backend_port,
-                    frontend_port=frontend_port,
-                    hsts=hsts,
-                    websocket=websocket
-                )
-
-                if success:
-                    st.success(f"✅ {message}")
-                    st.balloons()
-                    # Clear the form by resetting session state
-                    for key in ['new_rule_description', 'new_rule_domain', 'new_rule_host',
-                                'new_rule_frontend_port', 'new_rule_backend_port', 'new_rule_hsts', 'new_rule_ws']:
-                        if key in st.session_state:
-                            del st.session_state[key]
-                    st.rerun()
-                else:
-                    st.error(f"❌ {message}")
+    }
 
 
 def sync_tab():
     """Sync inventory with reverse proxy"""
     section_header("Sync Inventory with Proxy", "Compare containers with proxy rules", icon="🔄")
 
-    if not st.session_state.authenticated:
+    authenticated = st.session_state.authenticated
+    inventory = st.session_state.inventory
+    manager = st.session_state.proxy_manager
+
+    if not authenticated:
         empty_state(
             "Connect to Synology in the sidebar",
             icon="🔐",
@@ -557,7 +760,7 @@ def sync_tab():
         )
         return
 
-    if st.session_state.inventory is None:
+    if inventory is None:
         empty_state(
             "Scan infrastructure first",
             icon="📦",
@@ -565,8 +768,16 @@ def sync_tab():
         )
         return
 
-    inventory = st.session_state.inventory
-    manager = st.session_state.proxy_manager
+    # Outcome of the last auto-create, saved before its rerun
+    result = st.session_state.pop('auto_create_result', None)
+    if result is not None:
+        created, failed, skipped = result
+        if created > 0:
+            st.success(f"✅ Created {created} proxy rules")
+        if failed > 0:
+            st.warning(f"⚠️ Failed to create {failed} rules")
+        if skipped > 0:
+            st.info(f"ℹ️ Skipped {skipped} services whose domain already has a rule on port 443")
 
     # Refresh button aligned to the right
     _, col_refresh = st.columns([4, 1])
@@ -577,7 +788,9 @@ def sync_tab():
 
     # Generate sync report
     with st.spinner("Analyzing sync status..."):
-        report = manager.generate_sync_report(inventory.services)
+        sync = cached_sync_report(manager, inventory, id(manager), manager.rules_version,
+                                  id(inventory), inventory.version)
+    report = sync['report']
 
     # Summary metrics using stats_row
     stats_row({
@@ -591,54 +804,52 @@ def sync_tab():
         st.subheader("❌ Missing Reverse Proxy Rules")
         st.caption("Services defined in docker-compose but not in reverse proxy")
 
-        missing_data = []
-        for item in report['missing_proxies']:
-            missing_data.append({
-                'Service': item['service'],
-                'Port': item['port'],
-                'Stack': item['stack'],
-                'Suggested Domain': f"{item['service']}.akibrhast.synology.me"
-            })
-
-        df_missing = pd.DataFrame(missing_data)
-        st.dataframe(df_missing, width="stretch", hide_index=True)
+        st.dataframe(paginate(sync['missing'], 'sync_missing_page', TABLE_PAGE_SIZE), width="stretch", hide_index=True)
 
         # Auto-create option
         if st.button("🚀 Auto-Create Missing Proxies", type="primary"):
             with st.spinner("Creating proxy rules..."):
-                created = 0
-                failed = 0
-
                 progress_bar = st.progress(0)
                 status_text = st.empty()
-
-                for idx, item in enumerate(report['missing_proxies']):
-                    status_text.text(f"Creating proxy for {item['service']}...")
-
-                    success, message = manager.add_rule(
-                        description=item['service'],
-                        frontend_domain=f"{item['service']}.akibrhast.synology.me",
-                        backend_host='notmyproblemnas',
-                        backend_port=item['port'],
-                        hsts=True,
-                        websocket=False
-                    )
-
-                    if success:
-                        created += 1
-                    else:
-                        failed += 1
-
-                    progress_bar.progress((idx + 1) / len(report['missing_proxies']))
+                # Skip services whose domain already has an HTTPS rule
+                missing = manager.filter_new_suggestions([
+                    {**item, 'suggested_domain': f"{item['service']}.akibrhast.synology.me"}
+                    for item in report['missing_proxies']
+                ])
+                skipped = len(report['missing_proxies']) - len(missing)
+                done = 0
+
+                def show_progress(rule, success, message):
+                    nonlocal done
+                    done += 1
+                    status_text.text(f"Created proxy for {rule['description']}..." if success
+                                     else f"Failed to create proxy for {rule['description']}: {message}")
+                    progress_bar.progress(done / len(missing))
+
+                # Requests overlap with bounded concurrency; progress updates run on this thread
+                results = manager.add_rules_bulk(
+                    [
+                        {
+                            'description': item['service'],
+                            'frontend_domain': item['suggested_domain'],
+                            'backend_host': 'notmyproblemnas',
+                            'backend_port': item['port'],
+                            'hsts': True,
+                            'websocket': False
+                        }
+                        for item in missing
+                    ],
+                    max_workers=AUTO_CREATE_WORKERS,
+                    on_result=show_progress
+                )
+                created = sum(1 for _, success, _ in results if success)
+                failed = len(results) - created
 
                 status_text.empty()
                 progress_bar.empty()
 
-                if created > 0:
-                    st.success(f"✅ Created {created} proxy rules")
-                if failed > 0:
-                    st.warning(f"⚠️ Failed to create {failed} rules")
-
+                # Shown at the top of the tab after the rerun
+                st.session_state.auto_create_result = (created, failed, skipped)
                 st.rerun()
 
     # Orphaned proxies
@@ -647,17 +858,7 @@ def sync_tab():
         st.subheader("⚠️ Orphaned Reverse Proxy Rules")
         st.caption("Rules in reverse proxy but no matching docker-compose service")
 
-        orphaned_data = []
-        for item in report['orphaned_proxies']:
-            orphaned_data.append({
-                'ID': item['id'],
-                'Description': item['description'],
-                'Domain': item['domain'],
-                'Port': item['port']
-            })
-
-        df_orphaned = pd.DataFrame(orphaned_data)
-        st.dataframe(df_orphaned, width="stretch", hide_index=True)
+        st.dataframe(paginate(sync['orphaned'], 'sync_orphaned_page', TABLE_PAGE_SIZE), width="stretch", hide_index=True)
 
         st.caption("💡 These may be legacy rules or external services not managed by docker-compose")
 
@@ -666,16 +867,7 @@ def sync_tab():
         st.divider()
         st.subheader("✅ Services In Sync")
 
-        sync_data = []
-        for item in report['in_sync']:
-            sync_data.append({
-                'Service': item['service'],
-                'Port': item['port'],
-                'Domain': item['domain']
-            })
-
-        df_sync = pd.DataFrame(sync_data)
-        st.dataframe(df_sync, width="stretch", hide_index=True)
+        st.dataframe(paginate(sync['sync'], 'sync_in_sync_page', TABLE_PAGE_SIZE), width="stretch", hide_index=True)
 
 
 def main():
@@ -693,17 +885,15 @@ def main():
     # Sidebar
     sidebar_config()
 
-    # Main tabs
-    tab1, tab2, tab3 = st.tabs(["📋 Inventory", "🌐 Reverse Proxy", "🔄 Sync"])
-
-    with tab1:
-        inventory_tab()
-
-    with tab2:
-        proxy_tab()
-
-    with tab3:
-        sync_tab()
+    # Main views - st.tabs would run all three on every rerun, so only the
+    # selected one is rendered; the choice is kept in session state
+    views = {
+        "📋 Inventory": inventory_tab,
+        "🌐 Reverse Proxy": proxy_tab,
+        "🔄 Sync": sync_tab
+    }
+    selected = st.radio("View", list(views), horizontal=True, key="active_tab", label_visibility="collapsed")
+    views[selected]()
 
 
 if __name__ == "__main__":
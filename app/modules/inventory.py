@@ -2,40 +2,126 @@
 Infrastructure Inventory Manager - Portainer Edition
 Uses Portainer API as source of truth for infrastructure inventory
 """
+import re
+import threading
+import time
 import requests
 import urllib3
 from collections import defaultdict
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Disable SSL warnings for self-signed certificates
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# Concurrent Portainer requests while scanning endpoints
+SCAN_WORKERS = 8
+
+# Per-request settings shared by every Portainer call (self-signed certs)
+REQUEST_OPTIONS = {'verify': False, 'timeout': 10}
+
+# Portainer's answers to a bad username/password; retrying won't help
+CREDENTIAL_ERROR_STATUSES = (400, 401, 403, 422)
+
+# Seconds a JWT is trusted before it is silently renewed (Portainer's default lifetime is 8h)
+AUTH_TTL = 3600
+
+# Minimum seconds between authentication attempts after a connection failure
+AUTH_RETRY_INTERVAL = 30
+
+# Internal services that don't need proxy
+INTERNAL_KEYWORDS = (
+    'database', 'db', 'postgres', 'mysql', 'mariadb', 'mongo',
+    'redis', 'cache', 'rabbitmq', 'kafka', 'zookeeper',
+    'elasticsearch', 'logstash'
+)
+
+# Services that likely need websocket support
+WEBSOCKET_KEYWORDS = (
+    'plex', 'portainer', 'qbittorrent', 'immich',
+    'jellyfin', 'home-assistant', 'grafana', 'netdata'
+)
+
+# One alternation per keyword list: a single C-level scan per string
+# instead of a Python `in` test per keyword
+_INTERNAL_RE = re.compile('|'.join(map(re.escape, INTERNAL_KEYWORDS)), re.IGNORECASE)
+_WEBSOCKET_RE = re.compile('|'.join(map(re.escape, WEBSOCKET_KEYWORDS)), re.IGNORECASE)
+
+
+# Replicas, restarts and re-scans repeat the same (service, image) pairs,
+# so classification is memoized; maxsize keeps the caches bounded
+@lru_cache(maxsize=512)
+def _is_internal(service_name, image):
+    return bool(_INTERNAL_RE.search(service_name) or _INTERNAL_RE.search(image))
+
+
+@lru_cache(maxsize=512)
+def _is_websocket(service_name, image):
+    return bool(_WEBSOCKET_RE.search(service_name) or _WEBSOCKET_RE.search(image))
+
+
+def _build_session():
+    """
+    Create a keep-alive session whose pool covers every scan worker
+
+    Connection failures are retried for any method; read/status retries
+    are limited to GET, which is all the scan uses.
+    """
+    retry = Retry(
+        total=2,
+        connect=2,
+        backoff_factor=0.2,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET"})
+    )
+    adapter = HTTPAdapter(pool_connections=SCAN_WORKERS, pool_maxsize=SCAN_WORKERS * 2, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
 
 class PortainerClient:
     """Client for Portainer API"""
 
     def __init__(self, base_url, username, password):
         self.base_url = base_url.rstrip('/')
+        self.auth_url = f"{self.base_url}/api/auth"
+        self.endpoints_url = f"{self.base_url}/api/endpoints"
+        self.stacks_url = f"{self.base_url}/api/stacks"
+        self._container_urls = {}
         self.username = username
         self.password = password
         self.token = None
-        self.session = requests.Session()
+        self.session = _build_session()
         self.authenticated = False
         self.error_message = None
+        self._auth_lock = threading.Lock()
+        self._auth_ts = 0.0  # monotonic time of the last successful authentication
+        self._auth_ttl = AUTH_TTL
+        self._auth_failed_ts = float('-inf')
+        self._credentials_rejected = False
 
         # Authenticate
         self.authenticate()
 
     def authenticate(self):
         """Authenticate with Portainer and get JWT token"""
-        url = f"{self.base_url}/api/auth"
+        with self._auth_lock:
+            return self._authenticate()
 
+    def _authenticate(self):
+        """Authenticate with the auth lock held"""
         payload = {
             "username": self.username,
             "password": self.password
         }
 
         try:
-            response = self.session.post(url, json=payload, verify=False, timeout=10)
+            response = self.session.post(self.auth_url, json=payload, **REQUEST_OPTIONS)
 
             if response.status_code == 200:
                 data = response.json()
@@ -47,31 +133,75 @@ class PortainerClient:
                 })
 
                 self.authenticated = True
+                self._auth_ts = time.monotonic()
                 self.error_message = None
                 return True
             else:
-                self.authenticated = False
                 try:
                     error_data = response.json()
                     self.error_message = f"Authentication failed ({response.status_code}): {error_data.get('message', 'Unknown error')}"
                 except:
                     self.error_message = f"Authentication failed ({response.status_code})"
-                return False
+                self._credentials_rejected = response.status_code in CREDENTIAL_ERROR_STATUSES
+                return self._authentication_failed()
 
         except Exception as e:
-            self.authenticated = False
             self.error_message = f"Connection error: {str(e)}"
-            return False
+            return self._authentication_failed()
+
+    def _authentication_failed(self):
+        self.authenticated = False
+        self._auth_failed_ts = time.monotonic()
+        return False
+
+    def _auth_fresh(self):
+        return self.authenticated and time.monotonic() - self._auth_ts < self._auth_ttl
+
+    def _ensure_auth(self):
+        """
+        Make sure there is a usable JWT, renewing it when the TTL expires
+
+        Rejected credentials are never retried, and after a connection failure
+        another attempt waits AUTH_RETRY_INTERVAL.
+        """
+        if self._auth_fresh():
+            return True
+
+        with self._auth_lock:
+            if self._auth_fresh():
+                return True  # Another scan worker just authenticated
+            if self._credentials_rejected:
+                return False
+            if time.monotonic() - self._auth_failed_ts < AUTH_RETRY_INTERVAL:
+                return False
+            return self._authenticate()
+
+    def _get(self, url, **kwargs):
+        """
+        GET that re-authenticates once when the JWT has expired (401)
+
+        verify/timeout are passed per call rather than set on the session:
+        requests lets REQUESTS_CA_BUNDLE override a session-level verify.
+        """
+        response = self.session.get(url, **REQUEST_OPTIONS, **kwargs)
+
+        if response.status_code == 401:
+            token = self.token
+            with self._auth_lock:
+                # Parallel scan workers share the client; only one re-authenticates
+                refreshed = self.token != token or (not self._credentials_rejected and self._authenticate())
+            if refreshed:
+                response = self.session.get(url, **REQUEST_OPTIONS, **kwargs)
+
+        return response
 
     def get_endpoints(self):
         """Get all endpoints (Docker environments)"""
-        if not self.authenticated:
+        if not self._ensure_auth():
             return []
 
-        url = f"{self.base_url}/api/endpoints"
-
         try:
-            response = self.session.get(url, verify=False, timeout=10)
+            response = self._get(self.endpoints_url)
 
             if response.status_code == 200:
                 return response.json()
@@ -85,13 +215,11 @@ class PortainerClient:
 
     def get_stacks(self, endpoint_id):
         """Get all stacks for an endpoint"""
-        if not self.authenticated:
+        if not self._ensure_auth():
             return []
 
-        url = f"{self.base_url}/api/stacks"
-
         try:
-            response = self.session.get(url, verify=False, timeout=10)
+            response = self._get(self.stacks_url)
 
             if response.status_code == 200:
                 stacks = response.json()
@@ -105,14 +233,16 @@ class PortainerClient:
 
     def get_containers(self, endpoint_id):
         """Get all containers for an endpoint"""
-        if not self.authenticated:
+        if not self._ensure_auth():
             return []
 
-        url = f"{self.base_url}/api/endpoints/{endpoint_id}/docker/containers/json"
+        url = self._container_urls.get(endpoint_id)
+        if url is None:
+            url = self._container_urls[endpoint_id] = f"{self.endpoints_url}/{endpoint_id}/docker/containers/json"
         params = {'all': 'true'}  # Include stopped containers
 
         try:
-            response = self.session.get(url, params=params, verify=False, timeout=10)
+            response = self._get(url, params=params)
 
             if response.status_code == 200:
                 return response.json()
@@ -135,6 +265,11 @@ class InfrastructureInventory:
         self.endpoints = []
         self.stacks = []
         self.containers = []
+        self.version = 0  # Bumped on every scan so UI caches can key on it
+        self._scan_lock = threading.Lock()
+        self._port_index_services = None
+        self._port_index = None
+        self._proxyable = []  # (name, info) of running services with a port that need proxy
 
     def is_authenticated(self):
         """Check if Portainer connection is authenticated"""
@@ -149,26 +284,34 @@ class InfrastructureInventory:
         if not self.client.authenticated:
             return
 
-        # Get endpoints
-        self.endpoints = self.client.get_endpoints()
+        # The inventory may be shared between sessions, so scans are
+        # serialized and results swapped in whole rather than appended
+        with self._scan_lock:
+            # Get endpoints
+            endpoints = self.client.get_endpoints()
+            endpoint_ids = [endpoint.get('Id') for endpoint in endpoints]
 
-        # For each endpoint, get stacks and containers
-        for endpoint in self.endpoints:
-            endpoint_id = endpoint.get('Id')
+            # Stacks and containers for every endpoint are independent requests,
+            # so fetch them in parallel; results are joined in endpoint order
+            with ThreadPoolExecutor(max_workers=max(1, min(SCAN_WORKERS, len(endpoint_ids) * 2))) as pool:
+                stack_futures = [pool.submit(self.client.get_stacks, eid) for eid in endpoint_ids]
+                container_futures = [pool.submit(self.client.get_containers, eid) for eid in endpoint_ids]
 
-            # Get stacks
-            stacks = self.client.get_stacks(endpoint_id)
-            self.stacks.extend(stacks)
+                stacks = [stack for future in stack_futures for stack in future.result()]
+                containers = [c for future in container_futures for c in future.result()]
 
-            # Get containers
-            containers = self.client.get_containers(endpoint_id)
-            self.containers.extend(containers)
+            self.endpoints = endpoints
+            self.stacks = stacks
+            self.containers = containers
 
-        # Build service inventory from containers
-        self._build_inventory()
+            # Build service inventory from containers
+            self._build_inventory()
+            self.version += 1
 
     def _build_inventory(self):
         """Build service inventory from containers"""
+        services = {}
+
         for container in self.containers:
             # Extract container info
             names = container.get('Names', [])
@@ -203,7 +346,7 @@ class InfrastructureInventory:
             proxy_port = self._get_proxy_port(container_name, ports)
 
             # Store service info
-            self.services[container_name] = {
+            services[container_name] = {
                 'service_name': service_name,
                 'container_name': container_name,
                 'stack_dir': stack_name,  # Use stack name instead of directory
@@ -216,17 +359,22 @@ class InfrastructureInventory:
                 'network_mode': labels.get('com.docker.compose.network_mode', 'default')
             }
 
+        # Resolved once per scan so the proxy consumers skip the filter; pairs
+        # keep it consistent with whichever services dict a reader holds
+        self._proxyable = [
+            (name, info) for name, info in services.items()
+            if info['needs_proxy'] and info['port'] and info['state'] == 'running'
+        ]
+        self.services = services
+
     def _extract_ports(self, container):
         """Extract all published ports from container"""
-        ports_config = container.get('Ports', [])
-        published_ports = []
-
-        for port_mapping in ports_config:
-            public_port = port_mapping.get('PublicPort')
-            if public_port:
-                published_ports.append(public_port)
-
-        return sorted(published_ports)
+        # Docker lists a port once per binding (IPv4 and IPv6), so deduplicate
+        return sorted({
+            port_mapping['PublicPort']
+            for port_mapping in container.get('Ports', [])
+            if port_mapping.get('PublicPort')
+        })
 
     def _get_proxy_port(self, container_name, ports):
         """Determine which port should be used for reverse proxy matching"""
@@ -245,28 +393,23 @@ class InfrastructureInventory:
 
     def _needs_reverse_proxy(self, service_name, image):
         """Determine if service needs reverse proxy"""
-        # Internal services that don't need proxy
-        internal_keywords = [
-            'database', 'db', 'postgres', 'mysql', 'mariadb', 'mongo',
-            'redis', 'cache', 'rabbitmq', 'kafka', 'zookeeper',
-            'elasticsearch', 'logstash'
-        ]
+        # Internal services (databases, caches, queues) don't need proxy
+        return not _is_internal(service_name, image)
 
-        service_lower = service_name.lower()
-        image_lower = image.lower()
-
-        # Check if it's an internal service
-        for keyword in internal_keywords:
-            if keyword in service_lower or keyword in image_lower:
-                return False
+    def _port_indexes(self):
+        """
+        Port usage and conflicts, computed in one pass per services snapshot
 
-        return True
+        Returns:
+            Tuple of ({port: [container names]}, {port: [names]} for ports
+            used by more than one service)
+        """
+        services = self.services
+        if services is self._port_index_services:
+            return self._port_index
 
-    def check_port_conflicts(self):
-        """Check for port conflicts across services"""
         port_usage = defaultdict(list)
-
-        for container_name, info in self.services.items():
+        for container_name, info in services.items():
             port = info.get('port')
             if port:
                 port_usage[port].append(container_name)
@@ -276,83 +419,70 @@ class InfrastructureInventory:
             for port, names in port_usage.items()
             if len(names) > 1
         }
-        return conflicts
+
+        self._port_index = (port_usage, conflicts)
+        self._port_index_services = services
+        return self._port_index
+
+    def check_port_conflicts(self):
+        """Check for port conflicts across services"""
+        _, conflicts = self._port_indexes()
+        return dict(conflicts)
+
+    def iter_services_needing_proxy(self):
+        """Yield (name, info) for services that need reverse proxy"""
+        return iter(self._proxyable)
 
     def get_services_needing_proxy(self):
         """Get list of services that need reverse proxy"""
-        return {
-            name: info
-            for name, info in self.services.items()
-            if info.get('needs_proxy') and info.get('port') and info.get('state') == 'running'
-        }
+        return dict(self.iter_services_needing_proxy())
 
     def get_next_available_port(self, start=8000, end=9000):
         """Find next available port in range"""
-        used_ports = set(
-            info['port']
-            for info in self.services.values()
-            if info.get('port')
-        )
+        used_ports, _ = self._port_indexes()
 
-        for port in range(start, end):
-            if port not in used_ports:
-                return port
-        return None
+        # Set difference runs in C; min() of what's left is the first free port
+        free = set(range(start, end)).difference(used_ports)
+        return min(free) if free else None
 
     def _needs_websocket(self, service_name, image):
         """Determine if service likely needs websocket support"""
-        websocket_keywords = [
-            'plex', 'portainer', 'qbittorrent', 'immich',
-            'jellyfin', 'home-assistant', 'grafana', 'netdata'
-        ]
-
-        service_lower = service_name.lower()
-        image_lower = image.lower()
-
-        return any(
-            keyword in service_lower or keyword in image_lower
-            for keyword in websocket_keywords
-        )
-
-    def generate_proxy_suggestions(self, domain_suffix="akibrhast.synology.me"):
-        """Generate suggested reverse proxy rules for services"""
-        suggestions = []
-
-        for container_name, info in self.services.items():
-            if not info.get('needs_proxy'):
-                continue
-
-            if info.get('state') != 'running':
-                continue
-
-            port = info.get('port')
-            if not port:
-                continue
+        return _is_websocket(service_name, image)
 
+    def iter_proxy_suggestions(self, domain_suffix="akibrhast.synology.me"):
+        """Yield suggested reverse proxy rules for services, one at a time"""
+        for container_name, info in self._proxyable:
             # Use service name for domain (cleaner than container name)
             service_name = info.get('service_name', container_name)
 
-            suggestions.append({
+            yield {
                 'service': service_name,
-                'port': port,
+                'port': info['port'],
                 'suggested_domain': f"{service_name}.{domain_suffix}",
                 'websocket': self._needs_websocket(service_name, info.get('image', '')),
                 'hsts': True,
                 'stack': info.get('stack_dir')
-            })
+            }
 
-        return suggestions
+    def generate_proxy_suggestions(self, domain_suffix="akibrhast.synology.me"):
+        """Generate suggested reverse proxy rules for services"""
+        return list(self.iter_proxy_suggestions(domain_suffix))
 
     def get_statistics(self):
         """Get inventory statistics"""
         total_services = len(self.services)
-        running_services = sum(1 for s in self.services.values() if s.get('state') == 'running')
-        services_with_ports = sum(1 for s in self.services.values() if s.get('port'))
-        services_needing_proxy = sum(
-            1 for s in self.services.values()
-            if s.get('needs_proxy') and s.get('state') == 'running'
-        )
-        conflicts = len(self.check_port_conflicts())
+        running_services = 0
+        services_needing_proxy = 0
+
+        for s in self.services.values():
+            if s.get('state') == 'running':
+                running_services += 1
+                if s.get('needs_proxy'):
+                    services_needing_proxy += 1
+
+        port_usage, port_conflicts = self._port_indexes()
+        services_with_ports = sum(len(names) for names in port_usage.values())
+        conflicts = len(port_conflicts)
 
         return {
             'total_services': total_services,
@@ -4,11 +4,65 @@ Manages reverse proxy rules via Synology API
 """
 import requests
 import json
+import threading
+import time
 import urllib3
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Disable SSL warnings for self-signed certificates
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# Sized for the concurrent add_rule calls made by the sync tab's auto-create
+POOL_SIZE = 10
+
+# Seconds a fetched rule list is served before list_rules() fetches again
+RULES_TTL = 30
+
+# DSM errors meaning the login session is gone (timed out, kicked, unknown SID)
+SESSION_ERROR_CODES = (106, 107, 119)
+
+# DSM login errors that retrying can't fix (bad password, disabled account,
+# permission, 2FA required, IP blocked); repeating them feeds DSM's auto-block
+CREDENTIAL_ERROR_CODES = (400, 401, 402, 403, 404, 407)
+
+# Seconds a login is trusted before it is silently renewed
+AUTH_TTL = 3600
+
+# Minimum seconds between login attempts after a connection failure
+AUTH_RETRY_INTERVAL = 30
+
+
+def _port_key(port):
+    """Normalize a port for lookups so 443 and "443" match"""
+    try:
+        return int(port)
+    except (ValueError, TypeError):
+        return str(port)
+
+
+def _build_session():
+    """
+    Create a keep-alive session with a sized connection pool
+
+    Connection failures are retried for any method since nothing was sent;
+    read/status retries are limited to GET so rule creation is never replayed.
+    """
+    retry = Retry(
+        total=3,
+        connect=3,
+        backoff_factor=0.3,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET"})
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
 
 class SynologyReverseProxyManager:
     """Manages Synology reverse proxy rules via API"""
@@ -21,14 +75,54 @@ class SynologyReverseProxyManager:
         self.base_url = f"http://{host}:{port}"
         self.api_url = f"{self.base_url}/webapi/entry.cgi/SYNO.Core.AppPortal.ReverseProxy"
         self.rules_cache = None
+        self.rules_cache_time = 0.0
+        self.rules_ttl = RULES_TTL
+        self.rules_version = 0  # Bumped whenever the cached rule list changes
+        self._index_rules = None
+        self._index = None
         self.authenticated = False
         self.error_message = None
+        self._credentials = (username, password)
+        self._auth_ts = 0.0  # monotonic time of the last successful login
+        self._auth_ttl = AUTH_TTL
+        self._auth_failed_ts = float('-inf')  # monotonic time of the last failed attempt
+        self._credentials_rejected = False
+        # The manager is shared by every browser session; only one thread logs in at a time
+        self._auth_lock = threading.Lock()
 
         # Attempt login
         self.login(username, password)
 
+    def _auth_fresh(self):
+        return self.authenticated and time.monotonic() - self._auth_ts < self._auth_ttl
+
+    def _ensure_auth(self):
+        """
+        Make sure there is a usable login, renewing it when the TTL expires
+
+        Rejected credentials are never retried, and after a connection failure
+        another attempt waits AUTH_RETRY_INTERVAL, so reruns and cached helpers
+        can't hammer DSM with failing logins.
+        """
+        if self._auth_fresh():
+            return True
+
+        with self._auth_lock:
+            if self._auth_fresh():
+                return True  # Another thread just logged in
+            if self._credentials_rejected:
+                return False
+            if time.monotonic() - self._auth_failed_ts < AUTH_RETRY_INTERVAL:
+                return False
+            return self._login(*self._credentials)
+
     def login(self, username, password):
         """Login and get session token"""
+        with self._auth_lock:
+            return self._login(username, password)
+
+    def _login(self, username, password):
+        """Login with the auth lock held; the session and token are swapped in together"""
         try:
             url = f"{self.base_url}/webapi/auth.cgi"
             params = {
@@ -41,36 +135,68 @@ class SynologyReverseProxyManager:
                 "format": "cookie"
             }
 
-            self.session = requests.Session()
-            response = self.session.get(url, params=params, verify=False, timeout=10)
+            session = _build_session()
+            response = session.get(url, params=params, verify=False, timeout=10)
             data = response.json()
 
             if not data.get("success"):
                 error_code = data.get('error', {}).get('code')
                 self.error_message = f"Login failed. Error code: {error_code}"
-                self.authenticated = False
-                return False
+                self._credentials_rejected = error_code in CREDENTIAL_ERROR_CODES
+                return self._login_failed()
 
+            self.session = session
             self.syno_token = data.get("data", {}).get("synotoken")
             self.authenticated = True
+            self._auth_ts = time.monotonic()
             self.error_message = None
             return True
 
         except requests.exceptions.RequestException as e:
             self.error_message = f"Connection error: {str(e)}"
-            self.authenticated = False
-            return False
+            return self._login_failed()
         except Exception as e:
             self.error_message = f"Unexpected error: {str(e)}"
-            self.authenticated = False
-            return False
+            return self._login_failed()
+
+    def _login_failed(self):
+        self.authenticated = False
+        self._auth_failed_ts = time.monotonic()
+        return False
+
+    def _relogin(self, stale_token):
+        """Log in again after a session error unless another thread already did"""
+        with self._auth_lock:
+            if self.syno_token != stale_token:
+                return True
+            return not self._credentials_rejected and self._login(*self._credentials)
+
+    def _post(self, data):
+        """POST to the reverse proxy API, logging in once more on a lapsed session"""
+        token = self.syno_token
+        headers = {"Content-Type": "application/x-www-form-urlencoded; charset=UTF-8"}
+        if token:
+            headers["X-SYNO-TOKEN"] = token
+
+        response = self.session.post(self.api_url, data=data, headers=headers, verify=False, timeout=10)
+        result = response.json()
+
+        # A long-lived manager outlives its DSM session; log in once more and retry
+        error_code = result.get('error', {}).get('code')
+        if not result.get("success") and error_code in SESSION_ERROR_CODES and self._relogin(token):
+            headers["X-SYNO-TOKEN"] = self.syno_token
+            response = self.session.post(self.api_url, data=data, headers=headers, verify=False, timeout=10)
+            result = response.json()
+
+        return result
 
     def list_rules(self, refresh=False):
         """List all reverse proxy rules"""
-        if not self.authenticated:
+        if not self._ensure_auth():
             return []
 
-        if self.rules_cache and not refresh:
+        if (self.rules_cache is not None and not refresh
+                and time.monotonic() - self.rules_cache_time < self.rules_ttl):
             return self.rules_cache
 
         try:
@@ -80,12 +206,7 @@ class SynologyReverseProxyManager:
                 "method": "list"
             }
 
-            headers = {"Content-Type": "application/x-www-form-urlencoded; charset=UTF-8"}
-            if self.syno_token:
-                headers["X-SYNO-TOKEN"] = self.syno_token
-
-            response = self.session.post(self.api_url, data=data, headers=headers, verify=False, timeout=10)
-            result = response.json()
+            result = self._post(data)
 
             if not result.get("success"):
                 self.error_message = "Failed to list rules"
@@ -93,83 +214,103 @@ class SynologyReverseProxyManager:
 
             rules = result.get("data", {}).get("entries", [])
             self.rules_cache = rules
+            self.rules_cache_time = time.monotonic()
+            self.rules_version += 1
             return rules
 
         except Exception as e:
             self.error_message = f"Error listing rules: {str(e)}"
             return []
 
+    def _rules_index(self):
+        """
+        Lookup sets over the current rules, rebuilt only when the rule list changes
+
+        Returns:
+            Dict with descriptions, domains ({fqdn: [rule, ...]}), domain_ports
+            ((fqdn, port) pairs), backend_ports ({port: [conflict dict, ...]})
+            and used_ports (sorted list)
+        """
+        rules = self.list_rules()
+        if rules is self._index_rules:
+            return self._index
+
+        descriptions = set()
+        domains = {}
+        domain_ports = set()
+        backend_ports = {}
+
+        for rule in rules:
+            frontend = rule.get("frontend", {})
+            backend = rule.get("backend", {})
+            fqdn = frontend.get("fqdn")
+
+            descriptions.add(rule.get("description"))
+            domains.setdefault(fqdn, []).append(rule)
+
+            if frontend.get("port") is not None:
+                domain_ports.add((fqdn, _port_key(frontend.get("port"))))
+
+            port = backend.get("port")
+            if port:
+                backend_ports.setdefault(_port_key(port), []).append({
+                    'description': rule.get("description"),
+                    'domain': fqdn,
+                    'host': backend.get("fqdn"),
+                    'port': port
+                })
+
+        self._index = {
+            'descriptions': descriptions,
+            'domains': domains,
+            'domain_ports': domain_ports,
+            'backend_ports': backend_ports,
+            'used_ports': sorted({c['port'] for group in backend_ports.values() for c in group})
+        }
+        self._index_rules = rules
+        return self._index
+
     def description_exists(self, description):
         """Check if description already exists"""
-        rules = self.list_rules()
-        return any(rule.get("description") == description for rule in rules)
+        return description in self._rules_index()['descriptions']
 
     def domain_exists(self, domain):
         """Check if frontend domain already exists (deprecated - use domain_port_exists instead)"""
-        rules = self.list_rules()
-        return any(rule.get("frontend", {}).get("fqdn") == domain for rule in rules)
+        return domain in self._rules_index()['domains']
+
+    def get_domain_rules(self, domain):
+        """Get the rules using a frontend domain, on any port"""
+        return list(self._rules_index()['domains'].get(domain, []))
 
     def domain_port_exists(self, domain, port):
         """Check if frontend domain:port combination already exists"""
-        rules = self.list_rules()
-        for rule in rules:
-            frontend = rule.get("frontend", {})
-            # Convert both to int for comparison to handle type mismatches
-            existing_port = frontend.get("port")
-            if existing_port is not None:
-                try:
-                    if frontend.get("fqdn") == domain and int(existing_port) == int(port):
-                        return True
-                except (ValueError, TypeError):
-                    # If conversion fails, do string comparison
-                    if frontend.get("fqdn") == domain and str(existing_port) == str(port):
-                        return True
-        return False
+        return (domain, _port_key(port)) in self._rules_index()['domain_ports']
+
+    def filter_new_suggestions(self, suggestions, frontend_port=443):
+        """Drop suggestions whose domain is already proxied on frontend_port"""
+        domain_ports = self._rules_index()['domain_ports']
+        port = _port_key(frontend_port)
+        return [s for s in suggestions if (s['suggested_domain'], port) not in domain_ports]
 
     def get_port_conflicts(self, backend_port):
         """Get rules using the same backend port"""
-        rules = self.list_rules()
-        conflicts = []
-
-        for rule in rules:
-            if rule.get("backend", {}).get("port") == backend_port:
-                conflicts.append({
-                    'description': rule.get("description"),
-                    'domain': rule.get("frontend", {}).get("fqdn"),
-                    'host': rule.get("backend", {}).get("fqdn"),
-                    'port': backend_port
-                })
-
-        return conflicts
+        return list(self._rules_index()['backend_ports'].get(_port_key(backend_port), []))
 
     def get_used_ports(self):
         """Get all ports currently in use by reverse proxy rules"""
-        rules = self.list_rules()
-        used_ports = set()
-
-        for rule in rules:
-            port = rule.get("backend", {}).get("port")
-            if port:
-                used_ports.add(port)
-
-        return sorted(used_ports)
+        return list(self._rules_index()['used_ports'])
 
     def suggest_next_port(self, start_range=8000):
         """Suggest next available port"""
-        used_ports = self.get_used_ports()
-
-        for port in range(start_range, 65536):
-            if port not in used_ports:
-                return port
-        return None
+        used_ports = frozenset(self._rules_index()['used_ports'])
 
-    def add_rule(self, description, frontend_domain, backend_host, backend_port,
-                 frontend_port=443, hsts=True, websocket=False):
-        """Add a new reverse proxy rule"""
-        if not self.authenticated:
-            return False, "Not authenticated"
+        # Stops at the first gap, so the full 65536-wide range is never built
+        return next((port for port in range(start_range, 65536) if port not in used_ports), None)
 
-        # Build rule entry
+    @staticmethod
+    def _build_entry(description, frontend_domain, backend_host, backend_port,
+                     frontend_port=443, hsts=True, websocket=False):
+        """Build the API entry for a reverse proxy rule"""
         entry = {
             "description": description,
             "proxy_connect_timeout": 60,
@@ -199,6 +340,10 @@ class SynologyReverseProxyManager:
                 {"name": "Connection", "value": "$connection_upgrade"}
             ]
 
+        return entry
+
+    def _post_add_single(self, entry):
+        """Send one create request; the caller invalidates the rules cache"""
         try:
             data = {
                 "api": "SYNO.Core.AppPortal.ReverseProxy",
@@ -207,15 +352,9 @@ class SynologyReverseProxyManager:
                 "entry": json.dumps(entry, separators=(',', ':'))
             }
 
-            headers = {"Content-Type": "application/x-www-form-urlencoded; charset=UTF-8"}
-            if self.syno_token:
-                headers["X-SYNO-TOKEN"] = self.syno_token
-
-            response = self.session.post(self.api_url, data=data, headers=headers, verify=False, timeout=10)
-            result = response.json()
+            result = self._post(data)
 
             if result.get("success"):
-                self.rules_cache = None  # Invalidate cache
                 return True, "Rule added successfully"
             else:
                 error = result.get('error', {})
@@ -231,9 +370,62 @@ class SynologyReverseProxyManager:
         except Exception as e:
             return False, f"Exception: {str(e)}"
 
+    def add_rule(self, description, frontend_domain, backend_host, backend_port,
+                 frontend_port=443, hsts=True, websocket=False):
+        """Add a new reverse proxy rule"""
+        if not self._ensure_auth():
+            return False, "Not authenticated"
+
+        entry = self._build_entry(description, frontend_domain, backend_host, backend_port,
+                                  frontend_port=frontend_port, hsts=hsts, websocket=websocket)
+        success, message = self._post_add_single(entry)
+
+        if success:
+            self.rules_cache = None  # Invalidate cache
+            self.rules_version += 1
+        return success, message
+
+    def add_rules_bulk(self, rules, max_workers=4, on_result=None):
+        """
+        Add several reverse proxy rules with bounded concurrency
+
+        Args:
+            rules: List of dicts of add_rule keyword arguments
+            max_workers: Maximum concurrent create requests sent to DSM
+            on_result: Optional callback(rule, success, message), called on
+                the calling thread as each request completes
+
+        Returns:
+            List of (rule, success, message) in the order given
+        """
+        if not self._ensure_auth():
+            return [(rule, False, "Not authenticated") for rule in rules]
+
+        results = [None] * len(rules)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(rules)))) as pool:
+            futures = {
+                pool.submit(self._post_add_single, self._build_entry(**rule)): idx
+                for idx, rule in enumerate(rules)
+            }
+
+            for future in as_completed(futures):
+                idx = futures[future]
+                success, message = future.result()
+                results[idx] = (rules[idx], success, message)
+                if on_result:
+                    on_result(rules[idx], success, message)
+
+        # Invalidate once for the whole batch
+        if any(success for _, success, _ in results):
+            self.rules_cache = None
+            self.rules_version += 1
+
+        return results
+
     def delete_rule(self, rule_id):
         """Delete a reverse proxy rule by ID"""
-        if not self.authenticated:
+        if not self._ensure_auth():
             return False, "Not authenticated"
 
         try:
@@ -244,15 +436,11 @@ class SynologyReverseProxyManager:
                 "id": json.dumps([rule_id])
             }
 
-            headers = {"Content-Type": "application/x-www-form-urlencoded; charset=UTF-8"}
-            if self.syno_token:
-                headers["X-SYNO-TOKEN"] = self.syno_token
-
-            response = self.session.post(self.api_url, data=data, headers=headers, verify=False, timeout=10)
-            result = response.json()
+            result = self._post(data)
 
             if result.get("success"):
                 self.rules_cache = None  # Invalidate cache
+                self.rules_version += 1
                 return True, "Rule deleted successfully"
             else:
                 error_code = result.get('error', {}).get('code')
@@ -263,7 +451,7 @@ class SynologyReverseProxyManager:
 
     def delete_rules_bulk(self, rule_uuids):
         """Delete multiple reverse proxy rules by UUIDs"""
-        if not self.authenticated:
+        if not self._ensure_auth():
             return False, "Not authenticated"
 
         if not rule_uuids:
@@ -277,15 +465,11 @@ class SynologyReverseProxyManager:
                 "uuids": json.dumps(rule_uuids)
             }
 
-            headers = {"Content-Type": "application/x-www-form-urlencoded; charset=UTF-8"}
-            if self.syno_token:
-                headers["X-SYNO-TOKEN"] = self.syno_token
-
-            response = self.session.post(self.api_url, data=data, headers=headers, verify=False, timeout=10)
-            result = response.json()
+            result = self._post(data)
 
             if result.get("success"):
                 self.rules_cache = None  # Invalidate cache
+                self.rules_version += 1
                 count = len(rule_uuids)
                 return True, f"{count} rule{'s' if count > 1 else ''} deleted successfully"
             else:
@@ -295,9 +479,9 @@ class SynologyReverseProxyManager:
         except Exception as e:
             return False, f"Exception: {str(e)}"
 
-    def generate_sync_report(self, inventory_services):
+    def generate_sync_report(self, inventory_services, refresh=True):
         """Compare inventory with actual reverse proxy rules"""
-        actual_rules = self.list_rules(refresh=True)
+        actual_rules = self.list_rules(refresh=refresh)
 
         # Build lookup by port
         actual_by_port = {}
@@ -313,16 +497,22 @@ class SynologyReverseProxyManager:
             'in_sync': []
         }
 
-        # Check what's missing from proxy
-        for service_name, info in inventory_services.items():
-            if not info.get('needs_proxy'):
-                continue
+        # One pass over the inventory: classify proxied services and collect
+        # every known port for the orphan check below
+        known_ports = set()
 
+        for service_name, info in inventory_services.items():
             port = info.get('port')
             if not port:
                 continue
 
-            if port not in actual_by_port:
+            known_ports.add(port)
+
+            if not info.get('needs_proxy'):
+                continue
+
+            rule = actual_by_port.get(port)
+            if rule is None:
                 report['missing_proxies'].append({
                     'service': service_name,
                     'port': port,
@@ -332,16 +522,10 @@ class SynologyReverseProxyManager:
                 report['in_sync'].append({
                     'service': service_name,
                     'port': port,
-                    'domain': actual_by_port[port].get('frontend', {}).get('fqdn')
+                    'domain': rule.get('frontend', {}).get('fqdn')
                 })
 
         # Check for orphaned rules
-        known_ports = set(
-            info['port']
-            for info in inventory_services.values()
-            if info.get('port')
-        )
-
         for rule in actual_rules:
             port = rule.get('backend', {}).get('port')
             if port and port not in known_ports:
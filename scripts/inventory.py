@@ -6,8 +6,107 @@ Scans docker-compose files and syncs with reverse proxy
 import yaml
 import json
 import os
+import re
 from pathlib import Path
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+
+def _load_yaml(path):
+    """Load a YAML file, using libyaml when it is available"""
+    with open(path) as f:
+        return yaml.load(f, Loader=SafeLoader)
+
+
+# The only service keys scan_stacks reads; everything else is never constructed
+COMPOSE_FIELDS = frozenset({'image', 'container_name', 'network_mode', 'environment', 'ports'})
+
+
+def _mapping_items(loader, node):
+    """Yield (key, value node) pairs of a mapping node, resolving << merge keys"""
+    if not isinstance(node, yaml.MappingNode):
+        return
+    loader.flatten_mapping(node)
+    for key_node, value_node in node.value:
+        yield loader.construct_object(key_node), value_node
+
+
+def _load_compose_services(path):
+    """
+    Load only the fields scan_stacks needs from each service of a compose file
+    
+    The file is composed into nodes, but only the services mapping and the
+    COMPOSE_FIELDS of each service are turned into Python objects; volumes,
+    labels, healthchecks and top-level sections are skipped.
+    """
+    with open(path) as f:
+        loader = SafeLoader(f)
+        try:
+            root = loader.get_single_node()
+            services = {}
+            for key, value_node in _mapping_items(loader, root):
+                if key != 'services':
+                    continue
+                for service_name, service_node in _mapping_items(loader, value_node):
+                    services[service_name] = {
+                        field: loader.construct_object(node, deep=True)
+                        for field, node in _mapping_items(loader, service_node)
+                        if field in COMPOSE_FIELDS
+                    }
+            return services
+        finally:
+            loader.dispose()
+
+
+def _parse_stack(stack_dir):
+    """Parse a stack's docker-compose.yml and optional .proxy file"""
+    compose_file = stack_dir / 'docker-compose.yml'
+    if not compose_file.exists():
+        return None
+    
+    services = _load_compose_services(compose_file)
+    
+    proxy_file = stack_dir / '.proxy'
+    proxy_data = (_load_yaml(proxy_file) or {}) if proxy_file.exists() else None
+    
+    return services, proxy_data
+
+
+SYNC_WORKERS = 4  # Kept low to respect the Synology API
+
+INTERNAL_SERVICES = ('database', 'redis', 'postgres', 'mysql', 'mariadb')
+WEBSOCKET_SERVICES = ('plex', 'portainer', 'qbittorrent', 'immich', 'jellyfin')
+
+_INTERNAL_RE = re.compile('|'.join(map(re.escape, INTERNAL_SERVICES)), re.IGNORECASE)
+_WEBSOCKET_RE = re.compile('|'.join(map(re.escape, WEBSOCKET_SERVICES)), re.IGNORECASE)
+_PORT_KEY_RE = re.compile('PORT', re.IGNORECASE)
+
+
+def _to_int(value):
+    """int(value), or None when it isn't a number"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# Kept at module level so the caches don't hold a reference to the inventory
+@lru_cache(maxsize=256)
+def _is_internal(service_name):
+    return bool(_INTERNAL_RE.search(service_name))
+
+
+@lru_cache(maxsize=256)
+def _is_websocket(service_name):
+    return bool(_WEBSOCKET_RE.search(service_name))
+
 
 class InfrastructureInventory:
     def __init__(self, stacks_dir):
@@ -21,19 +120,18 @@ class InfrastructureInventory:
             if not stack_dir.is_dir():
                 continue
             
-            compose_file = stack_dir / 'docker-compose.yml'
-            if not compose_file.exists():
+            parsed = _parse_stack(stack_dir)
+            if parsed is None:
                 continue
             
-            with open(compose_file) as f:
-                compose_data = yaml.safe_load(f)
+            services, proxy_data = parsed
             
-            for service_name, config in compose_data.get('services', {}).items():
+            for service_name, config in services.items():
                 # Extract port
                 port = self._extract_port(config)
                 
                 # Determine if needs reverse proxy
-                needs_proxy = self._needs_reverse_proxy(stack_dir, service_name)
+                needs_proxy = self._needs_reverse_proxy(proxy_data, service_name)
                 
                 self.services[service_name] = {
                     'stack_dir': str(stack_dir),
@@ -51,12 +149,11 @@ class InfrastructureInventory:
             # Try to extract from environment
             env = config.get('environment', {})
             if isinstance(env, dict):
-                for key, value in env.items():
-                    if 'PORT' in key.upper():
-                        try:
-                            return int(value)
-                        except:
-                            pass
+                return next(
+                    (port for key, value in env.items()
+                     if _PORT_KEY_RE.search(key) and (port := _to_int(value)) is not None),
+                    None
+                )
             return None
         
         # Check ports mapping
@@ -64,23 +161,19 @@ class InfrastructureInventory:
         if ports:
             # Parse "8989:8989" format
             port_str = str(ports[0])
-            external_port = port_str.split(':')[0]
+            external_port = port_str.partition(':')[0]
             return int(external_port)
         
         return None
     
-    def _needs_reverse_proxy(self, stack_dir, service_name):
+    def _needs_reverse_proxy(self, proxy_data, service_name):
         """Determine if service needs reverse proxy (has web UI)"""
         # Check for .proxy file or metadata
-        proxy_file = stack_dir / '.proxy'
-        if proxy_file.exists():
-            with open(proxy_file) as f:
-                data = yaml.safe_load(f)
-                return data.get('enabled', True)
+        if proxy_data is not None:
+            return proxy_data.get('enabled', True)
         
         # Default: assume services need proxy unless explicitly internal
-        internal_services = ['database', 'redis', 'postgres', 'mysql', 'mariadb']
-        return not any(internal in service_name.lower() for internal in internal_services)
+        return not _is_internal(service_name)
     
     def check_port_conflicts(self):
         """Check for port conflicts"""
@@ -100,20 +193,25 @@ class InfrastructureInventory:
             "# Port Allocation Map",
             "",
             "Auto-generated from docker-compose files",
-            f"Last updated: {os.popen('date').read().strip()}",
+            f"Last updated: {datetime.now().astimezone().isoformat(timespec='seconds')}",
             "",
             "| Service | Port | Container | Needs Proxy | Image |",
             "|---------|------|-----------|-------------|-------|"
         ]
         
-        for service_name in sorted(self.services.keys()):
-            info = self.services[service_name]
+        # Build the table rows and the port usage in a single pass
+        port_usage = defaultdict(list)
+        
+        for service_name, info in sorted(self.services.items()):
             port = info.get('port', 'N/A')
             container = info.get('container_name', service_name)
             proxy = '✅' if info.get('needs_proxy') else '❌'
-            image = info.get('image', 'N/A').split(':')[0]  # Remove tag
+            image = (info.get('image') or 'N/A').partition(':')[0]  # Remove tag
             
             lines.append(f"| {service_name} | {port} | {container} | {proxy} | {image} |")
+            
+            if info.get('port'):
+                port_usage[info['port']].append(service_name)
         
         lines.extend([
             "",
@@ -121,7 +219,7 @@ class InfrastructureInventory:
             ""
         ])
         
-        conflicts = self.check_port_conflicts()
+        conflicts = {port: names for port, names in port_usage.items() if len(names) > 1}
         if conflicts:
             lines.append("⚠️ **CONFLICTS DETECTED:**")
             lines.append("")
@@ -136,12 +234,10 @@ class InfrastructureInventory:
             ""
         ])
         
-        used_ports = set(info['port'] for info in self.services.values() if info.get('port'))
         for start in [7000, 8000, 9000]:
-            for port in range(start, start + 100):
-                if port not in used_ports:
-                    lines.append(f"- Starting from {start}00s: **{port}**")
-                    break
+            port = next((p for p in range(start, start + 100) if p not in port_usage), None)
+            if port is not None:
+                lines.append(f"- Starting from {start}00s: **{port}**")
         
         return '\n'.join(lines)
     
@@ -169,84 +265,85 @@ class InfrastructureInventory:
     
     def _needs_websocket(self, service_name):
         """Determine if service needs websocket"""
-        websocket_services = ['plex', 'portainer', 'qbittorrent', 'immich', 'jellyfin']
-        return any(ws in service_name.lower() for ws in websocket_services)
+        return _is_websocket(service_name)
     
     def generate_sync_report(self, reverse_proxy_manager):
         """Compare inventory with actual reverse proxy rules"""
         # Get actual rules from Synology
         actual_rules = reverse_proxy_manager.list_rules(verbose=False)
         
-        # Build lookup
-        actual_by_port = {}
-        for rule in actual_rules:
-            port = rule.get('backend', {}).get('port')
-            if port:
-                actual_by_port[port] = rule
+        # One pass over each side, then compare with set operations
+        rule_ports = [rule.get('backend', {}).get('port') for rule in actual_rules]
+        actual_ports = {port for port in rule_ports if port}
         
-        # Compare
-        report = {
-            'missing_proxies': [],  # In compose but not in proxy
-            'orphaned_proxies': [], # In proxy but not in compose
-            'port_mismatches': [],  # Different ports
-            'in_sync': []
-        }
-        
-        # Check what's missing
+        needed = []
+        known_ports = set()
         for service_name, info in self.services.items():
-            if not info.get('needs_proxy'):
-                continue
-            
             port = info.get('port')
             if not port:
                 continue
-            
-            if port not in actual_by_port:
-                report['missing_proxies'].append({
+            known_ports.add(port)
+            if info.get('needs_proxy'):
+                needed.append((service_name, port))
+        
+        orphaned_ports = actual_ports - known_ports
+        
+        report = {
+            # In compose but not in proxy
+            'missing_proxies': [
+                {
                     'service': service_name,
                     'port': port,
                     'suggested_domain': f"{service_name}.akibrhast.synology.me"
-                })
-            else:
-                report['in_sync'].append(service_name)
-        
-        # Check for orphaned rules
-        known_ports = set(info['port'] for info in self.services.values() if info.get('port'))
-        for rule in actual_rules:
-            port = rule.get('backend', {}).get('port')
-            if port and port not in known_ports:
-                report['orphaned_proxies'].append({
+                }
+                for service_name, port in needed
+                if port not in actual_ports
+            ],
+            # In proxy but not in compose
+            'orphaned_proxies': [
+                {
                     'description': rule.get('description'),
                     'domain': rule.get('frontend', {}).get('fqdn'),
                     'port': port
-                })
+                }
+                for rule, port in zip(actual_rules, rule_ports)
+                if port in orphaned_ports
+            ],
+            'port_mismatches': [],  # Different ports
+            'in_sync': [service_name for service_name, port in needed if port in actual_ports]
+        }
         
         return report
 
 
 def print_sync_report(report):
     """Pretty print the sync report"""
-    print("\n" + "=" * 60)
-    print("INFRASTRUCTURE SYNC REPORT")
-    print("=" * 60)
+    # Collect the lines and write them in one call
+    lines = [
+        "",
+        "=" * 60,
+        "INFRASTRUCTURE SYNC REPORT",
+        "=" * 60
+    ]
     
     if report['missing_proxies']:
-        print("\n❌ Missing Reverse Proxy Rules:")
-        print("   (Defined in docker-compose but not in proxy)")
+        lines.append("\n❌ Missing Reverse Proxy Rules:")
+        lines.append("   (Defined in docker-compose but not in proxy)")
         for item in report['missing_proxies']:
-            print(f"   - {item['service']} (port {item['port']})")
-            print(f"     Suggested: {item['suggested_domain']}")
+            lines.append(f"   - {item['service']} (port {item['port']})")
+            lines.append(f"     Suggested: {item['suggested_domain']}")
     
     if report['orphaned_proxies']:
-        print("\n⚠️  Orphaned Reverse Proxy Rules:")
-        print("   (Defined in proxy but no matching docker-compose)")
+        lines.append("\n⚠️  Orphaned Reverse Proxy Rules:")
+        lines.append("   (Defined in proxy but no matching docker-compose)")
         for item in report['orphaned_proxies']:
-            print(f"   - {item['description']} ({item['domain']}) port {item['port']}")
+            lines.append(f"   - {item['description']} ({item['domain']}) port {item['port']}")
     
     if report['in_sync']:
-        print(f"\n✅ In Sync: {len(report['in_sync'])} services")
+        lines.append(f"\n✅ In Sync: {len(report['in_sync'])} services")
     
-    print()
+    lines.append("")
+    print('\n'.join(lines))
 
 
 def main():
@@ -330,16 +427,28 @@ Commands:
             if report['missing_proxies']:
                 print("Would you like to create the missing proxy rules? (y/n): ", end='')
                 if input().strip().lower() == 'y':
-                    for item in report['missing_proxies']:
-                        print(f"\nCreating proxy for {item['service']}...")
-                        manager.add_rule(
-                            description=item['service'],
-                            frontend_domain=item['suggested_domain'],
-                            backend_host='notmyproblemnas',
-                            backend_port=item['port'],
-                            hsts=True,
-                            websocket=False
-                        )
+                    missing = report['missing_proxies']
+                    print(f"\nCreating {len(missing)} proxy rules...")
+                    
+                    def create(item):
+                        # A failed request counts as one failed rule, not a lost connection
+                        try:
+                            return manager.add_rule(
+                                description=item['service'],
+                                frontend_domain=item['suggested_domain'],
+                                backend_host='notmyproblemnas',
+                                backend_port=item['port'],
+                                hsts=True,
+                                websocket=False
+                            )
+                        except Exception as e:
+                            print(f"❌ Failed to add rule '{item['service']}': {e}")
+                            return False
+                    
+                    with ThreadPoolExecutor(max_workers=SYNC_WORKERS) as executor:
+                        results = list(executor.map(create, missing))
+                    
+                    print(f"\n✅ Created {sum(results)} of {len(missing)} rules")
         except Exception as e:
             print(f"❌ Failed to connect to Synology: {e}")
             return 1
@@ -7,11 +7,33 @@ import requests
 import json
 import os
 import sys
+import threading
 import urllib3
+from collections import defaultdict
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-load_dotenv()
+
+POOL_SIZE = 4
+
+
+def _build_session():
+    """Create a keep-alive session; only GETs are retried so rules are never created twice"""
+    retry = Retry(
+        total=2,
+        backoff_factor=0.2,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET"})
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=retry)
+    
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
 
 class SynologyReverseProxyManager:
     def __init__(self, host, port, username, password):
@@ -22,6 +44,10 @@ class SynologyReverseProxyManager:
         self.base_url = f"http://{host}:{port}"
         self.api_url = f"{self.base_url}/webapi/entry.cgi/SYNO.Core.AppPortal.ReverseProxy"
         self.rules_cache = None  # Cache rules for validation
+        self._by_description = {}
+        self._by_fqdn = {}
+        self._by_backend_port = {}
+        self._cache_lock = threading.Lock()  # add_rule may run from worker threads
         
         if not self.login(username, password):
             raise Exception("Login failed")
@@ -39,7 +65,7 @@ class SynologyReverseProxyManager:
             "format": "cookie"
         }
         
-        self.session = requests.Session()
+        self.session = _build_session()
         response = self.session.get(url, params=params, verify=False)
         data = response.json()
         
@@ -48,74 +74,88 @@ class SynologyReverseProxyManager:
             return False
         
         self.syno_token = data.get("data", {}).get("synotoken")
+        
+        # Every API call is a form POST carrying the token, so set the headers once
+        self.session.headers["Content-Type"] = "application/x-www-form-urlencoded; charset=UTF-8"
+        if self.syno_token:
+            self.session.headers["X-SYNO-TOKEN"] = self.syno_token
+        
         print("✅ Logged in successfully\n")
         return True
     
+    def _fetch_rules(self, refresh=False):
+        """Get the rules from cache or the API without printing them"""
+        if self.rules_cache is not None and not refresh:
+            return self.rules_cache
+        
+        data = {
+            "api": "SYNO.Core.AppPortal.ReverseProxy",
+            "version": "1",
+            "method": "list"
+        }
+        
+        response = self.session.post(self.api_url, data=data, verify=False)
+        result = response.json()
+        
+        if not result.get("success"):
+            print(f"❌ Failed to list rules")
+            return []
+        
+        rules = result.get("data", {}).get("entries", [])
+        self.rules_cache = rules  # Cache for validation
+        self._index_rules(rules)
+        return rules
+    
     def list_rules(self, verbose=True, refresh=False):
         """List all reverse proxy rules"""
-        if self.rules_cache and not refresh:
-            rules = self.rules_cache
-        else:
-            data = {
-                "api": "SYNO.Core.AppPortal.ReverseProxy",
-                "version": "1",
-                "method": "list"
-            }
-            
-            headers = {"Content-Type": "application/x-www-form-urlencoded; charset=UTF-8"}
-            if self.syno_token:
-                headers["X-SYNO-TOKEN"] = self.syno_token
-            
-            response = self.session.post(self.api_url, data=data, headers=headers, verify=False)
-            result = response.json()
-            
-            if not result.get("success"):
-                print(f"❌ Failed to list rules")
-                return []
-            
-            rules = result.get("data", {}).get("entries", [])
-            self.rules_cache = rules  # Cache for validation
-        
+        rules = self._fetch_rules(refresh=refresh)
         if verbose:
-            print(f"📋 Found {len(rules)} reverse proxy rules:\n")
-            for i, rule in enumerate(rules, 1):
-                desc = rule.get("description")
-                frontend = rule.get("frontend", {})
-                backend = rule.get("backend", {})
-                ws = len(rule.get("customize_headers", [])) > 0
-                
-                print(f"{i:2d}. {desc}")
-                print(f"    Frontend: {frontend.get('fqdn')}:{frontend.get('port')}")
-                print(f"    Backend:  {backend.get('fqdn')}:{backend.get('port')}")
-                print(f"    HSTS: {frontend.get('https', {}).get('hsts')}, WebSocket: {ws}")
-                print()
-        
+            print_rules(rules)
         return rules
     
+    def _index_rules(self, rules):
+        """Build validation lookups once per fetched rule list"""
+        by_description = {}
+        by_fqdn = defaultdict(list)
+        by_backend_port = defaultdict(list)
+        
+        for rule in rules:
+            by_description[rule.get("description")] = rule
+            by_fqdn[rule.get("frontend", {}).get("fqdn")].append(rule)
+            port = rule.get("backend", {}).get("port")
+            if port:
+                by_backend_port[port].append(rule)
+        
+        self._by_description = by_description
+        self._by_fqdn = dict(by_fqdn)
+        self._by_backend_port = dict(by_backend_port)
+    
     def description_exists(self, description):
         """Check if description already exists"""
-        rules = self.list_rules(verbose=False)
-        return any(rule.get("description") == description for rule in rules)
+        self._fetch_rules()
+        return description in self._by_description
     
     def domain_exists(self, domain):
         """Check if frontend domain already exists"""
-        rules = self.list_rules(verbose=False)
-        return any(rule.get("frontend", {}).get("fqdn") == domain for rule in rules)
+        self._fetch_rules()
+        return domain in self._by_fqdn
+    
+    def rules_for_domain(self, domain):
+        """Get the rules using a frontend domain"""
+        self._fetch_rules()
+        return self._by_fqdn.get(domain, [])
     
     def get_port_conflicts(self, backend_port):
         """Get rules using the same backend port"""
-        rules = self.list_rules(verbose=False)
-        conflicts = []
-        
-        for rule in rules:
-            if rule.get("backend", {}).get("port") == backend_port:
-                conflicts.append({
-                    'description': rule.get("description"),
-                    'host': rule.get("backend", {}).get("fqdn"),
-                    'port': backend_port
-                })
-        
-        return conflicts
+        self._fetch_rules()
+        return [
+            {
+                'description': rule.get("description"),
+                'host': rule.get("backend", {}).get("fqdn"),
+                'port': backend_port
+            }
+            for rule in self._by_backend_port.get(backend_port, [])
+        ]
     
     def add_rule(self, description, frontend_domain, backend_host, backend_port, 
                  hsts=True, websocket=False):
@@ -156,50 +196,58 @@ class SynologyReverseProxyManager:
             "entry": json.dumps(entry, separators=(',', ':'))
         }
         
-        headers = {"Content-Type": "application/x-www-form-urlencoded; charset=UTF-8"}
-        if self.syno_token:
-            headers["X-SYNO-TOKEN"] = self.syno_token
-        
-        response = self.session.post(self.api_url, data=data, headers=headers, verify=False)
+        response = self.session.post(self.api_url, data=data, verify=False)
         result = response.json()
         
+        # Each outcome is printed with a single call so concurrent adds don't interleave
         if result.get("success"):
-            print(f"✅ Added: {description}")
-            print(f"   {frontend_domain}:443 → {backend_host}:{backend_port}")
-            self.rules_cache = None  # Invalidate cache
+            print(f"✅ Added: {description}\n"
+                  f"   {frontend_domain}:443 → {backend_host}:{backend_port}")
+            with self._cache_lock:
+                self.rules_cache = None  # Invalidate cache
+                self._by_description = {}
+                self._by_fqdn = {}
+                self._by_backend_port = {}
             return True
         else:
             error = result.get('error', {})
             error_code = error.get('code')
-            print(f"❌ Failed to add rule. Error: {error_code}")
+            message = f"❌ Failed to add rule '{description}'. Error: {error_code}"
             
             if error_code == 4154:
-                print("   Hint: Domain may already exist, be invalid, or not under your Synology account")
+                message += "\n   Hint: Domain may already exist, be invalid, or not under your Synology account"
             elif error_code == 101:
-                print("   Hint: Invalid parameter format")
+                message += "\n   Hint: Invalid parameter format"
             
+            print(message)
             return False
     
     def get_available_ports(self):
         """Show which ports are already in use"""
-        rules = self.list_rules(verbose=False)
-        used_ports = set()
-        
-        for rule in rules:
-            port = rule.get("backend", {}).get("port")
-            if port:
-                used_ports.add(port)
-        
-        return sorted(used_ports)
+        self._fetch_rules()
+        return sorted(self._by_backend_port)
     
     def suggest_port(self, start_range=8000):
         """Suggest an available port"""
-        used_ports = self.get_available_ports()
+        self._fetch_rules()
+        used_ports = self._by_backend_port  # dict keyed by port: O(1) membership
+        return next((port for port in range(start_range, 65536) if port not in used_ports), None)
+
+
+def print_rules(rules):
+    """Print a numbered summary of reverse proxy rules"""
+    print(f"📋 Found {len(rules)} reverse proxy rules:\n")
+    for i, rule in enumerate(rules, 1):
+        desc = rule.get("description")
+        frontend = rule.get("frontend", {})
+        backend = rule.get("backend", {})
+        ws = len(rule.get("customize_headers", [])) > 0
         
-        for port in range(start_range, 65536):
-            if port not in used_ports:
-                return port
-        return None
+        print(f"{i:2d}. {desc}")
+        print(f"    Frontend: {frontend.get('fqdn')}:{frontend.get('port')}")
+        print(f"    Backend:  {backend.get('fqdn')}:{backend.get('port')}")
+        print(f"    HSTS: {frontend.get('https', {}).get('hsts')}, WebSocket: {ws}")
+        print()
 
 
 def get_validated_input(prompt, validator=None, error_msg="Invalid input"):
@@ -262,11 +310,8 @@ def interactive_add(manager):
         if manager.domain_exists(frontend_domain):
             print(f"❌ Domain '{frontend_domain}' already exists. Choose a different domain.")
             # Show which rule is using it
-            rules = manager.list_rules(verbose=False)
-            for rule in rules:
-                if rule.get("frontend", {}).get("fqdn") == frontend_domain:
-                    existing_desc = rule.get("description")
-                    print(f"   Currently used by: {existing_desc}")
+            for rule in manager.rules_for_domain(frontend_domain):
+                print(f"   Currently used by: {rule.get('description')}")
             continue
         
         break
@@ -341,7 +386,8 @@ Environment variables (from .env):
         """)
         return 0
     
-    # Get credentials
+    # Get credentials (importers such as inventory.py load .env themselves)
+    load_dotenv()
     host = os.getenv("SYNOLOGY_HOST", "notmyproblemnas")
     port = os.getenv("SYNOLOGY_PORT", "5000")
     username = os.getenv("SYNOLOGY_USERNAME", "akib_admin")
@@ -4,17 +4,66 @@ Portainer-Synology Sync
 Uses Portainer API as source of truth to sync with Synology reverse proxy
 """
 import requests
+import base64
 import json
 import os
+import re
 import sys
+import time
 import urllib3
+from itertools import groupby
+from operator import itemgetter
 from pathlib import Path
 from dotenv import load_dotenv
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 load_dotenv()
 
+SCAN_WORKERS = 16
+
+# Portainer JWTs last hours, so reuse them across runs until shortly before expiry
+TOKEN_CACHE_DIR = Path.home() / '.cache' / 'portainer_sync'
+TOKEN_EXPIRY_MARGIN = 60
+
+# Internal services that don't need proxy
+INTERNAL_KEYWORDS = (
+    'database', 'db', 'postgres', 'mysql', 'mariadb', 'mongo',
+    'redis', 'cache', 'rabbitmq', 'kafka', 'zookeeper',
+    'elasticsearch', 'logstash'
+)
+
+WEBSOCKET_KEYWORDS = (
+    'plex', 'portainer', 'qbittorrent', 'immich',
+    'jellyfin', 'home-assistant', 'grafana', 'netdata'
+)
+
+_INTERNAL_RE = re.compile('|'.join(map(re.escape, INTERNAL_KEYWORDS)), re.IGNORECASE)
+_WEBSOCKET_RE = re.compile('|'.join(map(re.escape, WEBSOCKET_KEYWORDS)), re.IGNORECASE)
+
+
+def _build_session():
+    """
+    Create a keep-alive session whose connection pool covers every scan worker
+
+    POST is retried too since the only POST is /api/auth, which is safe to replay.
+    """
+    retry = Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET", "POST"})
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=SCAN_WORKERS * 2, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
 
 class PortainerClient:
     """Client for Portainer API"""
@@ -24,12 +73,64 @@ class PortainerClient:
         self.username = username
         self.password = password
         self.token = None
-        self.session = requests.Session()
+        self.session = _build_session()
+        self._all_stacks = None  # /api/stacks covers every endpoint, so fetch once
 
-        # Authenticate
-        if not self.authenticate():
+        # Authenticate, reusing a still-valid token from a previous run
+        if not (self._load_cached_token() or self.authenticate()):
             raise Exception("Failed to authenticate with Portainer")
 
+    def _token_cache_path(self):
+        """Path of the token cache for this user and Portainer instance"""
+        host = self.base_url.split('://', 1)[-1]
+        key = re.sub(r'[^A-Za-z0-9._-]', '_', f"{self.username}@{host}")
+        return TOKEN_CACHE_DIR / f"{key}.json"
+
+    def _load_cached_token(self):
+        """Use a cached JWT if it is unexpired and still accepted by Portainer"""
+        try:
+            with open(self._token_cache_path()) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        if cached.get('exp', 0) <= time.time() + TOKEN_EXPIRY_MARGIN:
+            return False
+
+        headers = {'Authorization': f"Bearer {cached.get('jwt')}"}
+        try:
+            response = self.session.get(
+                f"{self.base_url}/api/users/me", headers=headers, verify=False, timeout=10
+            )
+        except requests.exceptions.RequestException:
+            return False
+
+        if response.status_code != 200:
+            return False
+
+        self.token = cached['jwt']
+        self.session.headers.update(headers)
+        print("✅ Reusing cached Portainer session\n")
+        return True
+
+    def _save_token(self):
+        """Cache the JWT with its expiry, readable only by the current user"""
+        try:
+            payload = self.token.split('.')[1]
+            claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+            exp = claims['exp']
+        except (AttributeError, IndexError, KeyError, ValueError):
+            return  # Not a JWT we can read an expiry from; just don't cache it
+
+        path = self._token_cache_path()
+        try:
+            path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            fd = os.open(path, os.O_CREAT | os.O_WRONLY | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'jwt': self.token, 'exp': exp}, f)
+        except OSError:
+            pass  # Caching is best effort
+
     def authenticate(self):
         """Authenticate with Portainer and get JWT token"""
         url = f"{self.base_url}/api/auth"
@@ -50,6 +151,7 @@ class PortainerClient:
                 self.session.headers.update({
                     'Authorization': f'Bearer {self.token}'
                 })
+                self._save_token()
 
                 print("✅ Authenticated with Portainer\n")
                 return True
@@ -66,71 +168,60 @@ class PortainerClient:
             print(f"❌ Connection error: {e}")
             return False
 
-    def get_endpoints(self):
-        """Get all endpoints (Docker environments)"""
-        url = f"{self.base_url}/api/endpoints"
-
+    def _get_json(self, path, what, params=None):
+        """GET an API path and decode it, reporting failures and returning None"""
         try:
-            response = self.session.get(url, verify=False, timeout=10)
+            response = self.session.get(f"{self.base_url}{path}", params=params, verify=False, timeout=10)
+            response.raise_for_status()
+            return response.json()
 
-            if response.status_code == 200:
-                return response.json()
-            else:
-                print(f"❌ Failed to get endpoints: {response.status_code}")
-                return []
+        except requests.exceptions.HTTPError as e:
+            print(f"❌ Failed to get {what}: {e.response.status_code}")
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"❌ Error getting {what}: {e}")
+        return None
 
-        except Exception as e:
-            print(f"❌ Error getting endpoints: {e}")
-            return []
+    def get_endpoints(self):
+        """Get all endpoints (Docker environments)"""
+        return self._get_json("/api/endpoints", "endpoints") or []
+
+    def get_all_stacks(self, refresh=False):
+        """Get the stacks of every endpoint"""
+        if self._all_stacks is None or refresh:
+            self._all_stacks = self._get_json("/api/stacks", "stacks")
+        return self._all_stacks or []
 
     def get_stacks(self, endpoint_id):
         """Get all stacks for an endpoint"""
-        url = f"{self.base_url}/api/stacks"
-
-        try:
-            response = self.session.get(url, verify=False, timeout=10)
-
-            if response.status_code == 200:
-                stacks = response.json()
-                # Filter by endpoint
-                return [s for s in stacks if s.get('EndpointId') == endpoint_id]
-            else:
-                print(f"❌ Failed to get stacks: {response.status_code}")
-                return []
-
-        except Exception as e:
-            print(f"❌ Error getting stacks: {e}")
-            return []
-
-    def get_containers(self, endpoint_id):
-        """Get all containers for an endpoint"""
-        url = f"{self.base_url}/api/endpoints/{endpoint_id}/docker/containers/json"
-        params = {'all': 'true'}  # Include stopped containers
+        # Filter by endpoint
+        return [s for s in self.get_all_stacks() if s.get('EndpointId') == endpoint_id]
 
-        try:
-            response = self.session.get(url, params=params, verify=False, timeout=10)
+    def get_containers(self, endpoint_id, running_only=False):
+        """Get all containers for an endpoint, or only running ones filtered server-side"""
+        params = {'all': 'true', 'size': 'false'}  # Include stopped containers, skip size calculation
+        if running_only:
+            params['filters'] = json.dumps({'status': ['running']})
 
-            if response.status_code == 200:
-                return response.json()
-            else:
-                print(f"❌ Failed to get containers: {response.status_code}")
-                return []
-
-        except Exception as e:
-            print(f"❌ Error getting containers: {e}")
-            return []
+        path = f"/api/endpoints/{endpoint_id}/docker/containers/json"
+        return self._get_json(path, "containers", params) or []
 
 
 class PortainerInventory:
     """Build service inventory from Portainer"""
 
-    def __init__(self, portainer_client):
+    def __init__(self, portainer_client, running_only=False):
         self.client = portainer_client
+        self.running_only = running_only  # sync/create ignore stopped containers anyway
         self.services = {}
         self.endpoints = []
         self.stacks = []
         self.containers = []
 
+        # Side indexes filled by _build_inventory for the report helpers
+        self._proxy_ready = {}      # running services that need a proxy and have a port
+        self._known_ports = set()   # published ports of running services
+        self._by_port = {}          # published port -> container names
+
     def scan(self):
         """Scan Portainer for all services"""
         print("🔍 Scanning Portainer for services...")
@@ -139,22 +230,34 @@ class PortainerInventory:
         self.endpoints = self.client.get_endpoints()
         print(f"Found {len(self.endpoints)} endpoint(s)")
 
-        # For each endpoint, get stacks and containers
-        for endpoint in self.endpoints:
-            endpoint_id = endpoint.get('Id')
-            endpoint_name = endpoint.get('Name', 'unknown')
+        # Stacks and containers for every endpoint are independent requests,
+        # so fetch them all in parallel and report in endpoint order
+        endpoint_ids = [endpoint.get('Id') for endpoint in self.endpoints]
+        workers = max(1, min(SCAN_WORKERS, 2 * len(endpoint_ids)))
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            all_stacks_future = executor.submit(self.client.get_all_stacks)
+            container_futures = {eid: executor.submit(self.client.get_containers, eid, self.running_only) for eid in endpoint_ids}
+
+            stacks_by_endpoint = defaultdict(list)
+            for stack in all_stacks_future.result():
+                stacks_by_endpoint[stack.get('EndpointId')].append(stack)
+
+            for endpoint in self.endpoints:
+                endpoint_id = endpoint.get('Id')
+                endpoint_name = endpoint.get('Name', 'unknown')
 
-            print(f"\n📍 Scanning endpoint: {endpoint_name} (ID: {endpoint_id})")
+                print(f"\n📍 Scanning endpoint: {endpoint_name} (ID: {endpoint_id})")
 
-            # Get stacks
-            stacks = self.client.get_stacks(endpoint_id)
-            self.stacks.extend(stacks)
-            print(f"   Found {len(stacks)} stack(s)")
+                # Get stacks
+                stacks = stacks_by_endpoint[endpoint_id]
+                self.stacks.extend(stacks)
+                print(f"   Found {len(stacks)} stack(s)")
 
-            # Get containers
-            containers = self.client.get_containers(endpoint_id)
-            self.containers.extend(containers)
-            print(f"   Found {len(containers)} container(s)")
+                # Get containers
+                containers = container_futures[endpoint_id].result()
+                self.containers.extend(containers)
+                print(f"   Found {len(containers)} container(s)")
 
         # Build service inventory from containers
         self._build_inventory()
@@ -165,7 +268,7 @@ class PortainerInventory:
         """Build service inventory from containers"""
         for container in self.containers:
             # Extract container info
-            names = container.get('Names', [])
+            names = container.get('Names')
             if not names:
                 continue
 
@@ -173,25 +276,26 @@ class PortainerInventory:
             container_name = names[0].lstrip('/')
 
             # Get image
-            image = container.get('Image', 'unknown')
+            image = container.get('Image') or 'unknown'
 
             # Get state
-            state = container.get('State', 'unknown')
+            state = container.get('State') or 'unknown'
 
-            # Get labels
-            labels = container.get('Labels', {})
+            # Get labels (Docker may send null for a container without any)
+            labels = container.get('Labels') or {}
 
             # Extract stack name from labels
-            stack_name = labels.get('com.docker.compose.project', 'standalone')
+            stack_name = labels.get('com.docker.compose.project') or 'standalone'
 
             # Extract service name from labels or use container name
-            service_name = labels.get('com.docker.compose.service', container_name)
+            service_name = labels.get('com.docker.compose.service') or container_name
 
             # Extract ports
             ports = self._extract_ports(container)
 
-            # Determine if needs reverse proxy
+            # Determine if needs reverse proxy / websocket
             needs_proxy = self._needs_reverse_proxy(service_name, image)
+            websocket = self._needs_websocket(service_name, image)
 
             # Determine proxy port (port to use for reverse proxy matching)
             proxy_port = self._get_proxy_port(container_name, ports)
@@ -206,9 +310,38 @@ class PortainerInventory:
                 'ports': ports,  # All published ports
                 'published_port': proxy_port,  # Port used for reverse proxy (for sync)
                 'needs_proxy': needs_proxy,
+                'websocket': websocket,
                 'labels': labels
             }
 
+        self._index_services()
+
+    def _index_services(self):
+        """
+        Build the proxy, port and conflict indexes in one pass over the services
+
+        Done over the finished dict rather than per container so a container
+        name seen on two endpoints is only counted once, as before.
+        """
+        proxy_ready = {}
+        known_ports = set()
+        by_port = defaultdict(list)
+
+        for name, info in self.services.items():
+            port = info.get('published_port')
+            if not port:
+                continue
+
+            by_port[port].append(name)
+            if info.get('state') == 'running':
+                known_ports.add(port)
+                if info.get('needs_proxy'):
+                    proxy_ready[name] = info
+
+        self._proxy_ready = proxy_ready
+        self._known_ports = known_ports
+        self._by_port = dict(by_port)
+
     def _extract_ports(self, container):
         """Extract all published ports from container"""
         ports_config = container.get('Ports', [])
@@ -238,61 +371,32 @@ class PortainerInventory:
 
     def _needs_reverse_proxy(self, service_name, image):
         """Determine if service needs reverse proxy"""
-        # Internal services that don't need proxy
-        internal_keywords = [
-            'database', 'db', 'postgres', 'mysql', 'mariadb', 'mongo',
-            'redis', 'cache', 'rabbitmq', 'kafka', 'zookeeper',
-            'elasticsearch', 'logstash'
-        ]
-
-        service_lower = service_name.lower()
-        image_lower = image.lower()
-
         # Check if it's an internal service
-        for keyword in internal_keywords:
-            if keyword in service_lower or keyword in image_lower:
-                return False
-
-        return True
+        return not (_INTERNAL_RE.search(service_name) or _INTERNAL_RE.search(image))
 
     def check_port_conflicts(self):
         """Check for port conflicts"""
-        port_usage = defaultdict(list)
-
-        for container_name, info in self.services.items():
-            port = info.get('published_port')
-            if port:
-                port_usage[port].append(container_name)
-
         conflicts = {
             port: names
-            for port, names in port_usage.items()
+            for port, names in self._by_port.items()
             if len(names) > 1
         }
         return conflicts
 
     def get_services_needing_proxy(self):
         """Get services that need reverse proxy"""
-        return {
-            name: info
-            for name, info in self.services.items()
-            if info.get('needs_proxy') and info.get('published_port') and info.get('state') == 'running'
-        }
+        return dict(self._proxy_ready)
+
+    def get_running_ports(self):
+        """Get the published ports of running services"""
+        return self._known_ports
 
     def generate_proxy_suggestions(self, domain_suffix="akibrhast.synology.me"):
         """Generate suggested reverse proxy rules"""
         suggestions = []
 
-        for container_name, info in self.services.items():
-            if not info.get('needs_proxy'):
-                continue
-
-            if info.get('state') != 'running':
-                continue
-
-            port = info.get('published_port')
-            if not port:
-                continue
+        for container_name, info in self._proxy_ready.items():
+            port = info['published_port']
 
             # Use service name for domain (cleaner than container name)
             service_name = info.get('service_name', container_name)
@@ -302,7 +406,7 @@ class PortainerInventory:
                 'container': container_name,
                 'port': port,
                 'suggested_domain': f"{service_name}.{domain_suffix}",
-                'websocket': self._needs_websocket(service_name, info.get('image', '')),
+                'websocket': info.get('websocket', False),
                 'hsts': True,
                 'stack': info.get('stack')
             })
@@ -311,37 +415,31 @@ class PortainerInventory:
 
     def _needs_websocket(self, service_name, image):
         """Determine if service needs websocket"""
-        websocket_keywords = [
-            'plex', 'portainer', 'qbittorrent', 'immich',
-            'jellyfin', 'home-assistant', 'grafana', 'netdata'
-        ]
-
-        service_lower = service_name.lower()
-        image_lower = image.lower()
-
-        return any(
-            keyword in service_lower or keyword in image_lower
-            for keyword in websocket_keywords
-        )
+        return bool(_WEBSOCKET_RE.search(service_name) or _WEBSOCKET_RE.search(image))
 
 
 def print_inventory(inventory):
     """Pretty print the inventory"""
-    print("\n" + "=" * 80)
-    print("PORTAINER SERVICE INVENTORY")
-    print("=" * 80)
-
-    # Group by stack
-    by_stack = defaultdict(list)
-    for container_name, info in inventory.services.items():
-        stack = info.get('stack', 'standalone')
-        by_stack[stack].append((container_name, info))
+    # Collect the lines and write them in one call
+    lines = [
+        "",
+        "=" * 80,
+        "PORTAINER SERVICE INVENTORY",
+        "=" * 80
+    ]
+
+    # Group by stack: one sort by (stack, container) then consecutive runs
+    rows = sorted(
+        ((info.get('stack', 'standalone'), container_name, info)
+         for container_name, info in inventory.services.items()),
+        key=itemgetter(0, 1)
+    )
 
-    for stack_name in sorted(by_stack.keys()):
-        print(f"\n📦 Stack: {stack_name}")
-        print("-" * 80)
+    for stack_name, group in groupby(rows, key=itemgetter(0)):
+        lines.append(f"\n📦 Stack: {stack_name}")
+        lines.append("-" * 80)
 
-        for container_name, info in sorted(by_stack[stack_name]):
+        for _, container_name, info in group:
             service_name = info.get('service_name', container_name)
             all_ports = info.get('ports', [])
             proxy_port = info.get('published_port')
@@ -358,7 +456,9 @@ def print_inventory(inventory):
             else:
                 ports_str = 'N/A'
 
-            print(f"  {state_icon} {proxy} {service_name:25s} Port: {ports_str:12s} {info.get('image', '')[:40]}")
+            lines.append(f"  {state_icon} {proxy} {service_name:25s} Port: {ports_str:12s} {info.get('image', '')[:40]}")
+
+    print('\n'.join(lines))
 
 
 def generate_sync_report(inventory, reverse_proxy_manager):
@@ -370,10 +470,12 @@ def generate_sync_report(inventory, reverse_proxy_manager):
     # Get actual proxy rules
     actual_rules = reverse_proxy_manager.list_rules(verbose=False)
 
-    # Build lookup by port
+    # Build lookup by port, keeping each rule's port for the orphan check
     actual_by_port = {}
+    rule_ports = []
     for rule in actual_rules:
         port = rule.get('backend', {}).get('port')
+        rule_ports.append((rule, port))
         if port:
             actual_by_port[port] = rule
 
@@ -381,17 +483,8 @@ def generate_sync_report(inventory, reverse_proxy_manager):
     missing_proxies = []
     in_sync = []
 
-    for container_name, info in inventory.services.items():
-        if not info.get('needs_proxy'):
-            continue
-
-        if info.get('state') != 'running':
-            continue
-
-        port = info.get('published_port')
-        if not port:
-            continue
-
+    for container_name, info in inventory.get_services_needing_proxy().items():
+        port = info['published_port']
         service_name = info.get('service_name', container_name)
 
         if port not in actual_by_port:
@@ -410,42 +503,43 @@ def generate_sync_report(inventory, reverse_proxy_manager):
             })
 
     # Check for orphaned rules
-    known_ports = set(
-        info['published_port']
-        for info in inventory.services.values()
-        if info.get('published_port') and info.get('state') == 'running'
-    )
+    known_ports = inventory.get_running_ports()
+
+    # Every rule on an orphaned port is reported, not just the last one indexed
+    orphaned_ports = actual_by_port.keys() - known_ports
+    orphaned_proxies = [
+        {
+            'description': rule.get('description'),
+            'domain': rule.get('frontend', {}).get('fqdn'),
+            'port': port
+        }
+        for rule, port in rule_ports
+        if port in orphaned_ports
+    ] if orphaned_ports else []
 
-    orphaned_proxies = []
-    for rule in actual_rules:
-        port = rule.get('backend', {}).get('port')
-        if port and port not in known_ports:
-            orphaned_proxies.append({
-                'description': rule.get('description'),
-                'domain': rule.get('frontend', {}).get('fqdn'),
-                'port': port
-            })
+    # Print report in one call
+    lines = []
 
-    # Print report
     if missing_proxies:
-        print("\n❌ Missing Reverse Proxy Rules:")
-        print("   (Running in Portainer but not in proxy)")
+        lines.append("\n❌ Missing Reverse Proxy Rules:")
+        lines.append("   (Running in Portainer but not in proxy)")
         for item in missing_proxies:
-            print(f"   - {item['service']} (port {item['port']}) from stack '{item['stack']}'")
-            print(f"     Suggested: {item['suggested_domain']}")
+            lines.append(f"   - {item['service']} (port {item['port']}) from stack '{item['stack']}'")
+            lines.append(f"     Suggested: {item['suggested_domain']}")
 
     if orphaned_proxies:
-        print("\n⚠️  Orphaned Reverse Proxy Rules:")
-        print("   (In proxy but no running container)")
+        lines.append("\n⚠️  Orphaned Reverse Proxy Rules:")
+        lines.append("   (In proxy but no running container)")
         for item in orphaned_proxies:
-            print(f"   - {item['description']} ({item['domain']}) port {item['port']}")
+            lines.append(f"   - {item['description']} ({item['domain']}) port {item['port']}")
 
     if in_sync:
-        print(f"\n✅ In Sync: {len(in_sync)} services")
+        lines.append(f"\n✅ In Sync: {len(in_sync)} services")
         for item in in_sync:
-            print(f"   - {item['service']} (port {item['port']}) → {item['domain']}")
+            lines.append(f"   - {item['service']} (port {item['port']}) → {item['domain']}")
 
-    print()
+    lines.append("")
+    print('\n'.join(lines))
 
     return {
         'missing_proxies': missing_proxies,
@@ -454,8 +548,104 @@ def generate_sync_report(inventory, reverse_proxy_manager):
     }
 
 
+def print_conflicts(inventory, report_clean=False):
+    """Print port conflicts, optionally confirming when there are none"""
+    conflicts = inventory.check_port_conflicts()
+    if conflicts:
+        print("\n⚠️  PORT CONFLICTS:")
+        for port, containers in conflicts.items():
+            print(f"   Port {port}: {', '.join(containers)}")
+    elif report_clean:
+        print("✅ No port conflicts")
+
+
+def do_scan(inventory, command):
+    """Show the inventory and any port conflicts"""
+    print_inventory(inventory)
+
+    # Show port conflicts
+    print_conflicts(inventory)
+    return 0
+
+
+def do_conflicts(inventory, command):
+    """Check for port conflicts"""
+    print_conflicts(inventory, report_clean=True)
+    return 0
+
+
+def do_sync(inventory, command):
+    """Compare with the reverse proxy and, for 'create', add missing rules"""
+    # Get Synology credentials
+    synology_host = os.getenv("SYNOLOGY_HOST", "notmyproblemnas")
+    synology_port = os.getenv("SYNOLOGY_PORT", "5000")
+    synology_username = os.getenv("SYNOLOGY_USERNAME", "akib_admin")
+    synology_password = os.getenv("SYNOLOGY_PASSWORD")
+
+    if not synology_password:
+        import getpass
+        synology_password = getpass.getpass("Synology Password: ")
+
+    # Import reverse proxy manager (only the sync commands need it)
+    from manage_reverse_proxy import SynologyReverseProxyManager
+
+    try:
+        manager = SynologyReverseProxyManager(
+            synology_host, synology_port,
+            synology_username, synology_password
+        )
+    except Exception as e:
+        print(f"❌ Failed to connect to Synology: {e}")
+        return 1
+
+    # Generate sync report
+    report = generate_sync_report(inventory, manager)
+
+    # Offer to create missing rules
+    if command == 'create' and report['missing_proxies']:
+        print("\nWould you like to create the missing proxy rules? (y/n): ", end='')
+        if input().strip().lower() == 'y':
+            # Index once instead of searching the inventory per missing rule;
+            # the first container of a service wins, as the linear search did
+            by_service = {}
+            for info in inventory.services.values():
+                by_service.setdefault(info['service_name'], info)
+
+            for item in report['missing_proxies']:
+                service_name = item['service']
+
+                # Check if service needs websocket
+                container_info = by_service.get(service_name)
+                websocket = container_info.get('websocket', False) if container_info else False
+
+                print(f"\nCreating proxy for {service_name}...")
+                success = manager.add_rule(
+                    description=service_name,
+                    frontend_domain=item['suggested_domain'],
+                    backend_host='notmyproblemnas',
+                    backend_port=item['port'],
+                    hsts=True,
+                    websocket=websocket
+                )
+
+                if not success:
+                    print(f"   ⚠️  Failed to create rule for {service_name}")
+
+    return 0
+
+
+COMMANDS = {
+    'scan': do_scan,
+    'conflicts': do_conflicts,
+    'sync': do_sync,
+    'create': do_sync,
+}
+
+
 def main():
-    if len(sys.argv) > 1 and sys.argv[1] in ['-h', '--help']:
+    command = sys.argv[1] if len(sys.argv) > 1 else 'scan'
+
+    if command in ['-h', '--help']:
         print("""
 Portainer-Synology Sync
 
@@ -482,6 +672,13 @@ Environment variables (from .env):
         """)
         return 0
 
+    # Reject unknown commands before connecting to anything
+    handler = COMMANDS.get(command)
+    if handler is None:
+        print(f"Unknown command: {command}")
+        print("Run with --help for usage")
+        return 1
+
     # Get Portainer credentials
     portainer_host = os.getenv("PORTAINER_HOST", "notmyproblemnas")
     portainer_port = os.getenv("PORTAINER_PORT", "9000")
@@ -503,95 +700,10 @@ Environment variables (from .env):
         return 1
 
     # Build inventory
-    inventory = PortainerInventory(portainer)
+    inventory = PortainerInventory(portainer, running_only=handler is do_sync)
     inventory.scan()
 
-    command = sys.argv[1] if len(sys.argv) > 1 else 'scan'
-
-    if command == 'scan':
-        print_inventory(inventory)
-
-        # Show port conflicts
-        conflicts = inventory.check_port_conflicts()
-        if conflicts:
-            print("\n⚠️  PORT CONFLICTS:")
-            for port, containers in conflicts.items():
-                print(f"   Port {port}: {', '.join(containers)}")
-
-    elif command == 'conflicts':
-        conflicts = inventory.check_port_conflicts()
-        if conflicts:
-            print("\n⚠️  PORT CONFLICTS:")
-            for port, containers in conflicts.items():
-                print(f"   Port {port}: {', '.join(containers)}")
-        else:
-            print("✅ No port conflicts")
-
-    elif command in ['sync', 'create']:
-        # Get Synology credentials
-        synology_host = os.getenv("SYNOLOGY_HOST", "notmyproblemnas")
-        synology_port = os.getenv("SYNOLOGY_PORT", "5000")
-        synology_username = os.getenv("SYNOLOGY_USERNAME", "akib_admin")
-        synology_password = os.getenv("SYNOLOGY_PASSWORD")
-
-        if not synology_password:
-            import getpass
-            synology_password = getpass.getpass("Synology Password: ")
-
-        # Import reverse proxy manager
-        from manage_reverse_proxy import SynologyReverseProxyManager
-
-        try:
-            manager = SynologyReverseProxyManager(
-                synology_host, synology_port,
-                synology_username, synology_password
-            )
-        except Exception as e:
-            print(f"❌ Failed to connect to Synology: {e}")
-            return 1
-
-        # Generate sync report
-        report = generate_sync_report(inventory, manager)
-
-        # Offer to create missing rules
-        if command == 'create' and report['missing_proxies']:
-            print("\nWould you like to create the missing proxy rules? (y/n): ", end='')
-            if input().strip().lower() == 'y':
-                for item in report['missing_proxies']:
-                    service_name = item['service']
-
-                    # Check if service needs websocket
-                    container_info = next(
-                        (info for name, info in inventory.services.items() if info['service_name'] == service_name),
-                        None
-                    )
-
-                    websocket = False
-                    if container_info:
-                        websocket = inventory._needs_websocket(
-                            service_name,
-                            container_info.get('image', '')
-                        )
-
-                    print(f"\nCreating proxy for {service_name}...")
-                    success = manager.add_rule(
-                        description=service_name,
-                        frontend_domain=item['suggested_domain'],
-                        backend_host='notmyproblemnas',
-                        backend_port=item['port'],
-                        hsts=True,
-                        websocket=websocket
-                    )
-
-                    if not success:
-                        print(f"   ⚠️  Failed to create rule for {service_name}")
-
-    else:
-        print(f"Unknown command: {command}")
-        print("Run with --help for usage")
-        return 1
-
-    return 0
+    return handler(inventory, command)
 
 
 if __name__ == '__main__':